@@ -0,0 +1,86 @@
+# benchmarks/html_backends.py
+"""
+Сравнение бэкендов HTML-парсинга на сохранённых страницах бирж.
+
+Для каждой страницы из benchmarks/fixtures и каждого бэкенда из
+parsers.HTML_BACKENDS меряет время _parse_page (медиана), выделения памяти
+(tracemalloc) и проверяет, что список заказов совпадает с эталоном
+html.parser.
+
+Запуск из корня репозитория:
+    python -m benchmarks.html_backends [--rounds 50]
+"""
+import argparse
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+from parsers import HTML_BACKENDS, FLRuParser, FreelanceRuParser, KworkParser
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+CASES = [
+    (FLRuParser, "fl_ru.html"),
+    (FreelanceRuParser, "freelanceru.html"),
+    (KworkParser, "kwork_cards.html"),  # HTML-fallback Kwork, без __INITIAL_STATE__
+]
+
+
+def available_backends():
+    backends = []
+    for backend in HTML_BACKENDS:
+        if backend == "selectolax":
+            try:
+                import selectolax  # noqa: F401
+            except ImportError:
+                print("selectolax is not installed, skipping")
+                continue
+        backends.append(backend)
+    return backends
+
+
+def measure(parser, html: str, rounds: int):
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        parser._parse_page(html, "python")
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    orders = parser._parse_page(html, "python")
+    snapshot = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sum(stat.count for stat in snapshot.statistics("filename"))
+
+    return orders, statistics.median(timings), peak, blocks
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--rounds", type=int, default=50)
+    args = arg_parser.parse_args()
+
+    backends = available_backends()
+
+    print(f"{'page':<18} {'backend':<12} {'orders':>6} {'median ms':>10} {'peak KB':>9} {'blocks':>8}  same")
+    for parser_cls, fixture in CASES:
+        html = (FIXTURES / fixture).read_text(encoding="utf-8")
+        reference = None
+
+        for backend in backends:
+            parser = parser_cls()
+            parser.HTML_BACKEND = backend
+            orders, median, peak, blocks = measure(parser, html, args.rounds)
+            if reference is None:
+                reference = orders
+            same = "yes" if orders == reference else "NO"
+            print(
+                f"{fixture:<18} {backend:<12} {len(orders):>6} {median * 1000:>10.2f} "
+                f"{peak / 1024:>9.0f} {blocks:>8}  {same}"
+            )
+
+
+if __name__ == "__main__":
+    main()
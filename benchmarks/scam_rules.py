@@ -0,0 +1,112 @@
+# benchmarks/scam_rules.py
+"""
+Стоимость ScamDetector.analyze на один заказ: прежний цикл re.search против RuleEngine.
+
+Корпус — размеченные заказы из benchmarks/fixtures/scam_corpus.json
+(scam / ok / edge — пограничные тексты для IGNORECASE) плюс заказы,
+разобранные из остальных фикстур бирж. Для каждого заказа результат
+анализа сверяется с прежней реализацией (она повторена здесь как
+эталон), затем меряется медиана времени анализа всего корпуса.
+
+Запуск из корня репозитория:
+    python -m benchmarks.scam_rules [--rounds 50]
+"""
+import argparse
+import json
+import re
+import statistics
+import time
+from pathlib import Path
+
+from parsers import FLRuParser, FreelanceRuParser, HHParser, KworkParser
+from services.scam_detector import ScamDetector
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+PAGES = [
+    (FLRuParser, "fl_ru.html"),
+    (FreelanceRuParser, "freelanceru.html"),
+    (KworkParser, "kwork.html"),
+]
+
+
+class LegacyRules:
+    """Прежняя проверка: re.search по каждому шаблону"""
+
+    def __init__(self, rules):
+        self._rules = list(rules)
+
+    def match(self, text: str):
+        return {rule_id for rule_id, pattern in self._rules if re.search(pattern, text, re.IGNORECASE)}
+
+
+class LegacyScamDetector(ScamDetector):
+    def __init__(self):
+        self._rules = LegacyRules(self.rule_patterns())
+
+
+def load_corpus():
+    corpus = json.loads((FIXTURES / "scam_corpus.json").read_text(encoding="utf-8"))
+
+    orders = []
+    for parser_cls, fixture in PAGES:
+        orders += parser_cls()._parse_page((FIXTURES / fixture).read_text(encoding="utf-8"), "python")
+    vacancies = json.loads((FIXTURES / "hh_vacancies.json").read_text(encoding="utf-8"))
+    orders += filter(None, (HHParser()._parse_item(item, "python") for item in vacancies["items"]))
+
+    for order in orders:
+        corpus.append({"label": order["source"], **{key: order[key] for key in ("title", "description", "budget", "budget_value")}})
+    return corpus
+
+
+def analyze_all(detector, corpus):
+    return [
+        detector.analyze(order["title"], order["description"], order["budget"], order["budget_value"])
+        for order in corpus
+    ]
+
+
+def measure(detector, corpus, rounds: int) -> float:
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        analyze_all(detector, corpus)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) / len(corpus)
+
+
+def run(args):
+    corpus = load_corpus()
+    legacy, engine = LegacyScamDetector(), ScamDetector()
+
+    expected = analyze_all(legacy, corpus)
+    actual = analyze_all(engine, corpus)
+    mismatches = [order["title"] for order, a, b in zip(corpus, expected, actual) if a != b]
+
+    legacy_time = measure(legacy, corpus, args.rounds)
+    engine_time = measure(engine, corpus, args.rounds)
+
+    labelled = [(order["label"], result["risk_level"]) for order, result in zip(corpus, actual)]
+    flagged = {
+        label: sum(level in ("high", "medium") for l, level in labelled if l == label)
+        for label in ("scam", "ok")
+    }
+    totals = {label: sum(l == label for l, _ in labelled) for label in ("scam", "ok")}
+
+    print(f"orders          {len(corpus)}")
+    print(f"legacy          {legacy_time * 1e6:.1f} us/order")
+    print(f"rule engine     {engine_time * 1e6:.1f} us/order ({legacy_time / engine_time:.1f}x)")
+    print(f"identical       {'yes' if not mismatches else 'NO: ' + ', '.join(mismatches)}")
+    print(f"scam flagged    {flagged['scam']}/{totals['scam']}")
+    print(f"ok flagged      {flagged['ok']}/{totals['ok']}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--rounds", type=int, default=50)
+    args = arg_parser.parse_args()
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -127,29 +127,13 @@ async def api_turbo_parse(request: web.Request) -> web.Response:
     if not user.has_active_subscription():
         return web.json_response({'error': 'Subscription required'}, status=403)
     
-    from parsers import ALL_PARSERS
-    
-    new_orders_count = 0
-    categories = user.categories or ['design', 'python', 'copywriting', 'marketing']
-    
-    for parser in ALL_PARSERS:
-        for category in categories:
-            try:
-                orders = await parser.parse_orders(category)
-                for order_data in orders:
-                    order = await Database.save_order(order_data)
-                    if order:
-                        new_orders_count += 1
-            except Exception as e:
-                logger.error(f"Parse error {parser.SOURCE_NAME}: {e}")
-    
-    # Закрываем сессии
-    for parser in ALL_PARSERS:
-        await parser.close()
+    # Общий обход бирж, как у кнопки в боте и в Mini App
+    from services.turbo import turbo_refresh
+    result = await turbo_refresh.start().wait()
     
     return web.json_response({
-        'success': True,
-        'new_orders': new_orders_count
+        'success': result['error'] is None,
+        'new_orders': result['new_orders']
     })
 
 
@@ -1,5 +1,6 @@
 # bot/handlers/start.py
 import os
+import time
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, WebAppInfo, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.filters import CommandStart
@@ -69,31 +70,25 @@ async def cmd_start(message: Message):
 
 @router.callback_query(F.data == "turbo_parse")
 async def turbo_parse_handler(callback: CallbackQuery):
-    """Принудительный парсинг"""
-    user = await Database.get_user(callback.from_user.id)
+    """Принудительный парсинг: общий обход бирж, как и в Mini App"""
+    from services.turbo import turbo_refresh
     
     await callback.answer("⚡ Запускаю турбо-парсинг...")
     msg = await callback.message.answer("🔍 Сканирую биржи...")
     
     try:
-        from parsers import ALL_PARSERS
-        
-        new_count = 0
-        categories = (user.categories if user else None) or ['design', 'python', 'copywriting', 'marketing']
-        
-        for parser in ALL_PARSERS:
-            for category in categories:
-                try:
-                    orders = await parser.parse_orders(category)
-                    for order_data in orders:
-                        order = await Database.save_order(order_data)
-                        if order:
-                            new_count += 1
-                except Exception as e:
-                    pass
-            await parser.close()
+        run = turbo_refresh.start()
+        edited_at = time.monotonic()
+        async for progress in run.progress():
+            # Не чаще раза в TURBO_PROGRESS_INTERVAL, чтобы не упереться в лимиты Telegram
+            if not progress['finished'] and time.monotonic() - edited_at >= Config.TURBO_PROGRESS_INTERVAL:
+                await msg.edit_text(f"🔍 Сканирую биржи... {progress['done']}/{progress['total']}")
+                edited_at = time.monotonic()
         
-        await msg.edit_text(f"✅ Найдено <b>{new_count}</b> новых заказов!")
+        if progress['error']:
+            await msg.edit_text("⚠️ Ошибка при парсинге")
+        else:
+            await msg.edit_text(f"✅ Найдено <b>{progress['new_orders']}</b> новых заказов!")
         
     except Exception as e:
         await msg.edit_text("⚠️ Ошибка при парсинге")
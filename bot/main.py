@@ -5,6 +5,9 @@ import os
 import json
 import hashlib
 import hmac
+import time
+from collections import OrderedDict
+from functools import lru_cache
 from urllib.parse import parse_qsl
 from datetime import datetime, timezone
 from aiohttp import web
@@ -17,8 +20,11 @@ from database.db import Database, init_db
 
 from bot.handlers import start, categories, subscription, generate_response, profile, orders
 
-from services.scam_detector import scam_detector
-from services.price_calculator import price_calculator
+from services.ingest import ingest_pipeline
+from services.activity import activity_buffer
+from services.pubsub import order_broadcaster, OrderEvent
+from services.turbo import turbo_refresh
+from services import ranking
 from services.achievements import achievements
 from services.market_analytics import market_analytics
 
@@ -28,17 +34,39 @@ logger = logging.getLogger(__name__)
 
 # ============ AUTH ============
 
+# Проверенные initData: sha256 строки -> (данные пользователя, когда истекает)
+_verified_init_data: "OrderedDict[bytes, tuple]" = OrderedDict()
+
+
+@lru_cache(maxsize=1)
+def _webapp_secret_key(bot_token: str) -> bytes:
+    return hmac.new(b'WebAppData', bot_token.encode(), hashlib.sha256).digest()
+
+
 def verify_telegram_data(init_data: str) -> dict:
     if not init_data:
         return None
+    
+    # Mini App шлёт одну и ту же initData весь сеанс — повторно HMAC не считаем
+    key = hashlib.sha256(init_data.encode()).digest()
+    cached = _verified_init_data.get(key)
+    if cached and cached[1] > time.monotonic():
+        return cached[0]
+    
     try:
         parsed = dict(parse_qsl(init_data))
         check_hash = parsed.pop('hash', '')
         data_check_string = '\n'.join(f'{k}={v}' for k, v in sorted(parsed.items()))
-        secret_key = hmac.new(b'WebAppData', Config.BOT_TOKEN.encode(), hashlib.sha256).digest()
+        secret_key = _webapp_secret_key(Config.BOT_TOKEN)
         calculated_hash = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
         if calculated_hash == check_hash:
-            return json.loads(parsed.get('user', '{}'))
+            user_data = json.loads(parsed.get('user', '{}'))
+            if user_data:
+                _verified_init_data[key] = (user_data, time.monotonic() + Config.AUTH_CACHE_TTL)
+                _verified_init_data.move_to_end(key)
+                while len(_verified_init_data) > Config.AUTH_CACHE_SIZE:
+                    _verified_init_data.popitem(last=False)
+            return user_data
     except:
         pass
     return None
@@ -60,7 +88,8 @@ async def get_user_from_request(request: web.Request):
             username=user_data.get('username'),
             full_name=f"{user_data.get('first_name', '')} {user_data.get('last_name', '')}".strip()
         )
-        await Database.update_user_activity(user_data.get('id'))
+        # Активность и streak пишутся в БД отложенно, пачкой
+        activity_buffer.touch(user_data.get('id'))
         return user
     return None
 
@@ -105,78 +134,181 @@ async def api_user(request: web.Request) -> web.Response:
     })
 
 
+def _orders_cursor(row, sort: str) -> str:
+    sort_key = row.sort_key.isoformat() if sort == 'new' else repr(row.sort_key)
+    return f"{sort_key}_{row.Order.id}"
+
+
+def _parse_orders_cursor(cursor: str, sort: str) -> tuple:
+    sort_key, _, order_id = cursor.rpartition('_')
+    sort_key = datetime.fromisoformat(sort_key) if sort == 'new' else float(sort_key)
+    return sort_key, int(order_id)
+
+
 async def api_orders(request: web.Request) -> web.Response:
-    category = request.query.get('category', 'all')
+    """Лента заказов: фильтры, sort=new|score, страницы по курсору X-Next-Cursor и ETag"""
+    query = request.query
+    try:
+        category = query.get('category', 'all')
+        sort = query.get('sort', 'new')
+        if sort not in ('new', 'score'):
+            raise ValueError(sort)
+        filters = {
+            'category': category if category != 'all' else None,
+            'source': query.get('source') or None,
+            'min_budget': int(query['min_budget']) if query.get('min_budget') else None,
+            'max_scam': int(query['max_scam']) if query.get('max_scam') else None,
+            'before': _parse_orders_cursor(query['cursor'], sort) if query.get('cursor') else None,
+        }
+        limit = min(max(int(query.get('limit', Config.ORDERS_PAGE_SIZE)), 1), Config.ORDERS_PAGE_MAX)
+    except ValueError:
+        return web.json_response({'error': 'Bad filter value'}, status=400)
     
-    db_orders = await Database.get_orders(category if category != 'all' else None, limit=50)
+    # Пользователь нужен только для персональной оценки, лента доступна и без него
+    user = await get_user_from_request(request)
     
-    orders_data = []
-    for order in db_orders:
-        now = datetime.now(timezone.utc)
-        created = order.created_at.replace(tzinfo=timezone.utc) if order.created_at.tzinfo is None else order.created_at
-        diff = (now - created).total_seconds()
-        
-        if diff < 60: time_ago = "сейчас"
-        elif diff < 3600: time_ago = f"{int(diff // 60)} мин"
-        elif diff < 86400: time_ago = f"{int(diff // 3600)} ч"
-        else: time_ago = f"{int(diff // 86400)} дн"
-        
-        score = 50
-        if order.budget_value and order.budget_value >= 50000: score += 35
-        elif order.budget_value and order.budget_value >= 20000: score += 20
-        if diff < 1800: score += 15
-        score = min(score, 99)
-        
-        orders_data.append({
-            'id': order.id,
-            'title': order.title,
-            'description': (order.description or '')[:300],
-            'source': order.source,
-            'budget': order.budget or 'Договорная',
-            'budget_value': order.budget_value or 0,
-            'url': order.url,
-            'category': order.category,
-            'time_ago': time_ago,
-            'ai_score': score,
-            'hot': (order.budget_value or 0) >= 30000,
-            'scam_score': order.scam_score or 0,
-        })
+    # На один больше — чтобы понять, есть ли следующая страница
+    rows = await Database.get_orders_page(limit=limit + 1, sort=sort, user=user, **filters)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    # Слабый ETag: time_ago меняется со временем, а состав и оценки — только с новыми заказами и свежестью
+    page_state = f"{[(row.Order.id, row.Order.scam_score, row.ai_score) for row in rows]}|{has_more}"
+    headers = {
+        'ETag': f'W/"{hashlib.sha1(page_state.encode()).hexdigest()[:20]}"',
+        'Cache-Control': 'no-cache',
+        'Vary': 'X-Telegram-Init-Data',
+    }
+    if has_more:
+        headers['X-Next-Cursor'] = _orders_cursor(rows[-1], sort)
+    if headers['ETag'] in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+        return web.Response(status=304, headers=headers)
+    
+    now = datetime.now(timezone.utc)
+    orders_data = [_order_json(row.Order, now, row.ai_score, bool(row.hot)) for row in rows]
     
-    return web.json_response(orders_data)
+    return web.json_response(orders_data, headers=headers)
 
 
-async def api_turbo_parse(request: web.Request) -> web.Response:
-    from parsers import ALL_PARSERS
+def _order_json(order, now: datetime, ai_score: int, hot: bool) -> dict:
+    """Карточка заказа для Mini App. Оценку считает запрос ленты (services/ranking.py)"""
+    created = order.created_at.replace(tzinfo=timezone.utc) if order.created_at.tzinfo is None else order.created_at
+    diff = (now - created).total_seconds()
     
-    new_count = 0
-    categories = ['design', 'python', 'copywriting', 'marketing']
+    if diff < 60: time_ago = "сейчас"
+    elif diff < 3600: time_ago = f"{int(diff // 60)} мин"
+    elif diff < 86400: time_ago = f"{int(diff // 3600)} ч"
+    else: time_ago = f"{int(diff // 86400)} дн"
     
-    for parser in ALL_PARSERS:
-        for category in categories:
-            try:
-                found = await parser.parse_orders(category)
-                for order_data in found:
-                    # Анализируем на скам
-                    scam_result = await scam_detector.analyze(
-                        order_data.get('title', ''),
-                        order_data.get('description', ''),
-                        order_data.get('budget', ''),
-                        order_data.get('budget_value', 0)
-                    )
-                    order_data['scam_score'] = scam_result['risk_score']
-                    order_data['scam_warnings'] = scam_result['warnings']
-                    
-                    order = await Database.save_order(order_data)
-                    if order:
-                        new_count += 1
-            except Exception as e:
-                logger.error(f"Parse error {parser.SOURCE_NAME}: {e}")
-        try:
-            await parser.close()
-        except:
-            pass
+    return {
+        'id': order.id,
+        'title': order.title,
+        'description': (order.description or '')[:300],
+        'source': order.source,
+        'budget': order.budget or 'Договорная',
+        'budget_value': order.budget_value or 0,
+        'url': order.url,
+        'category': order.category,
+        'time_ago': time_ago,
+        'ai_score': ai_score,
+        'hot': hot,
+        'scam_score': order.scam_score or 0,
+    }
+
+
+def _order_event_data(order) -> str:
+    # Событие одно на всех подписчиков, поэтому оценка без персонализации
+    now = datetime.now(timezone.utc)
+    data = _order_json(order, now, ranking.display_score(order, now), (order.budget_value or 0) >= ranking.HOT_BUDGET)
+    return json.dumps(data, ensure_ascii=False)
+
+
+async def api_orders_stream(request: web.Request) -> web.StreamResponse:
+    """Живая лента новых заказов: SSE или long-poll, пропущенные досылаются из БД"""
+    try:
+        category = request.query.get('category', 'all')
+        category = category if category != 'all' else None
+        min_budget = int(request.query.get('min_budget') or 0)
+        after = int(request.headers.get('Last-Event-ID') or request.query.get('after') or 0)
+    except ValueError:
+        return web.json_response({'error': 'Bad filter value'}, status=400)
+    
+    # Подписываемся до запроса в БД, чтобы заказ, сохранённый между ними, не потерялся
+    subscription = order_broadcaster.subscribe(category, min_budget)
+    try:
+        missed = []
+        if after:
+            missed = await Database.get_orders_since(after, category, min_budget, Config.STREAM_REPLAY_LIMIT)
+        if 'text/event-stream' in request.headers.get('Accept', ''):
+            return await _stream_orders_sse(request, subscription, missed)
+        return await _stream_orders_long_poll(subscription, missed)
+    finally:
+        order_broadcaster.unsubscribe(subscription)
+
+
+async def _stream_orders_sse(request: web.Request, subscription, missed) -> web.StreamResponse:
+    response = web.StreamResponse(headers={
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+    await response.prepare(request)
+    
+    # Досланные из БД могли попасть и в буфер подписки
+    replayed = {order.id for order in missed}
+    events = [OrderEvent(order) for order in missed]
+    try:
+        await response.write(b'retry: 3000\n\n')
+        while True:
+            if events:
+                await response.write(''.join(
+                    f"id: {event.order.id}\nevent: order\ndata: {event.data(_order_event_data)}\n\n"
+                    for event in events
+                ).encode())
+            else:
+                # Пинг в тишине: держит соединение через прокси и замечает ушедших клиентов
+                await response.write(b': ping\n\n')
+            events = [
+                event for event in await subscription.next_events(Config.STREAM_HEARTBEAT)
+                if event.order.id not in replayed
+            ]
+    except ConnectionResetError:
+        pass
+    return response
+
+
+async def _stream_orders_long_poll(subscription, missed) -> web.Response:
+    events = [OrderEvent(order) for order in missed]
+    if not events:
+        events = await subscription.next_events(Config.STREAM_POLL_TIMEOUT)
+    body = '[' + ','.join(event.data(_order_event_data) for event in events) + ']'
+    return web.Response(text=body, content_type='application/json')
+
+
+async def api_turbo_parse(request: web.Request) -> web.StreamResponse:
+    """Турбо-парсинг: общий обход бирж, прогресс в NDJSON или итог одним ответом"""
+    user = await get_user_from_request(request)
+    if not user:
+        return web.json_response({'error': 'Unauthorized'}, status=401)
     
-    return web.json_response({'success': True, 'new_orders': new_count})
+    run = turbo_refresh.start()
+    if 'application/x-ndjson' not in request.headers.get('Accept', ''):
+        result = await run.wait()
+        return web.json_response({'success': result['error'] is None, 'new_orders': result['new_orders']})
+    
+    response = web.StreamResponse(headers={
+        'Content-Type': 'application/x-ndjson',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+    await response.prepare(request)
+    try:
+        async for progress in run.progress():
+            await response.write(json.dumps(progress).encode() + b'\n')
+    except ConnectionResetError:
+        # Обход продолжается и без этого клиента
+        pass
+    return response
 
 
 async def api_generate_response(request: web.Request) -> web.Response:
@@ -231,15 +363,13 @@ async def api_scam_check(request: web.Request) -> web.Response:
         if not order:
             return web.json_response({'error': 'Not found'}, status=404)
         
-        result = await scam_detector.analyze(
-            order.title,
-            order.description or '',
-            order.budget or '',
-            order.budget_value or 0
-        )
-        
-        # Сохраняем результат
-        await Database.update_order_scam(order_id, result['risk_score'], result['warnings'])
+        # Анализ сохранён при записи заказа
+        result = ingest_pipeline.stored_scam_result(order)
+        if result is None:
+            # Правила поменялись, а фоновый пересчёт до заказа ещё не дошёл
+            analysis = await ingest_pipeline.analyze(order)
+            await Database.update_orders_analysis([{'id': order.id, **analysis}])
+            result = ingest_pipeline.stored_scam_result(analysis)
         
         # XP за использование
         await Database.add_xp(user.telegram_id, 2)
@@ -264,12 +394,8 @@ async def api_price_calculate(request: web.Request) -> web.Response:
         if not order:
             return web.json_response({'error': 'Not found'}, status=404)
         
-        result = await price_calculator.calculate(
-            order.title,
-            order.description or '',
-            order.category or 'python',
-            order.budget_value or 0
-        )
+        # Сложность берётся из анализа, сохранённого при записи заказа
+        result = ingest_pipeline.price_result(order)
         
         return web.json_response(result)
     except Exception as e:
@@ -539,6 +665,38 @@ async def handle_index(request):
 async def handle_health(request):
     return web.Response(text="OK")
 
+async def api_monitoring(request):
+    # Внутренняя статистика и тексты ошибок бирж — только для админов
+    user = await get_user_from_request(request)
+    if not user:
+        return web.json_response({'error': 'Unauthorized'}, status=401)
+    if not Config.is_admin(user.telegram_id):
+        return web.json_response({'error': 'Forbidden'}, status=403)
+    
+    from parsers import http_pool, circuit_breakers
+    from services.seen_ids import seen_ids
+    from services.routing import routing_index
+    from services.delivery import delivery_queue
+    from services.render_cache import render_cache
+    from services.polling import poll_planner
+    from services.dedup import dedup_index
+    from services.ingest import ingest_pipeline
+    return web.json_response({
+        'http_pool': http_pool.stats(),
+        'seen_ids': seen_ids.stats(),
+        'routing': routing_index.stats(),
+        'delivery': delivery_queue.stats(),
+        'render_cache': render_cache.stats(),
+        'polling': poll_planner.stats(),
+        'circuits': circuit_breakers.stats(),
+        'dedup': dedup_index.stats(),
+        'ingest': ingest_pipeline.stats(),
+        'activity': activity_buffer.stats(),
+        'stream': order_broadcaster.stats(),
+        'turbo': turbo_refresh.stats(),
+        'auth_cache': len(_verified_init_data),
+    })
+
 async def handle_webapp(request):
     domain = os.getenv('RAILWAY_PUBLIC_DOMAIN', request.host)
     api_base = f"https://{domain}" if domain else ""
@@ -560,6 +718,7 @@ def create_web_app():
     # Pages
     app.router.add_get('/', handle_index)
     app.router.add_get('/health', handle_health)
+    app.router.add_get('/api/monitoring', api_monitoring)
     app.router.add_get('/webapp', handle_webapp)
     
     # User API
@@ -568,6 +727,7 @@ def create_web_app():
     
     # Orders API
     app.router.add_get('/api/orders', api_orders)
+    app.router.add_get('/api/orders/stream', api_orders_stream)
     app.router.add_post('/api/turbo-parse', api_turbo_parse)
     app.router.add_post('/api/generate-response', api_generate_response)
     app.router.add_post('/api/scam-check', api_scam_check)
@@ -594,6 +754,19 @@ def create_web_app():
 # ============ MAIN ============
 
 async def main():
+    from parsers import http_pool
+    from services.delivery import delivery_queue
+    try:
+        await run_bot()
+    finally:
+        await turbo_refresh.stop()
+        await delivery_queue.stop()
+        await activity_buffer.stop()
+        await http_pool.close()
+        ingest_pipeline.shutdown()
+
+
+async def run_bot():
     await init_db()
     logger.info("Database initialized")
     
@@ -607,6 +780,13 @@ async def main():
     dp.include_router(profile.router)
     dp.include_router(orders.router)
     
+    # Мониторинг бирж и рассылка уведомлений: парсинг только ставит сообщения в очередь
+    from services.delivery import delivery_queue
+    from services.scheduler import OrderScheduler
+    delivery_queue.start(bot)
+    activity_buffer.start()
+    OrderScheduler(bot).start()
+    
     app = create_web_app()
     domain = os.getenv('RAILWAY_PUBLIC_DOMAIN', '')
     
@@ -823,7 +1003,7 @@ WEBAPP_HTML = '''<!DOCTYPE html>
             <span id="turboIcon">⚡</span><span id="turboText">НАЙТИ ЗАКАЗЫ</span>
         </button>
         
-        <div class="section-title"><span>📋 Заказы</span><span class="badge" id="ordersCount">0</span></div>
+        <div class="section-title"><span>📋 Заказы</span><span class="badge" id="ordersCount">0</span><span class="badge" id="ordersSort" style="margin-left:auto;cursor:pointer;" onclick="toggleOrdersSort()">🆕 Новые</span></div>
         <div id="ordersList"><div class="loading"><div class="spinner"></div></div></div>
     </div>
     
@@ -950,6 +1130,8 @@ WEBAPP_HTML = '''<!DOCTYPE html>
         
         let user = null;
         let orders = [];
+        let ordersCursor = null;
+        let ordersSort = 'new';
         let selectedCategories = [];
         
         const CATEGORIES = [
@@ -963,6 +1145,7 @@ WEBAPP_HTML = '''<!DOCTYPE html>
         document.addEventListener('DOMContentLoaded',async()=>{
             await loadUser();
             await loadOrders();
+            startOrderStream();
             await loadStats();
             await loadAchievements();
             renderCategories();
@@ -1006,19 +1189,59 @@ WEBAPP_HTML = '''<!DOCTYPE html>
             }catch(e){console.error(e);}
         }
         
-        async function loadOrders(){
+        function toggleOrdersSort(){
+            haptic('light');
+            ordersSort=ordersSort==='new'?'score':'new';
+            document.getElementById('ordersSort').textContent=ordersSort==='new'?'🆕 Новые':'🎯 Лучшие';
+            loadOrders();
+        }
+        
+        async function loadOrders(more){
             const list=document.getElementById('ordersList');
-            list.innerHTML='<div class="loading"><div class="spinner"></div></div>';
+            if(!more)list.innerHTML='<div class="loading"><div class="spinner"></div></div>';
             try{
-                const r=await fetch(API+'/api/orders');
-                orders=await r.json();
+                const params=new URLSearchParams({sort:ordersSort});
+                if(more&&ordersCursor)params.set('cursor',ordersCursor);
+                const r=await fetch(API+'/api/orders?'+params,{headers:{'X-Telegram-Init-Data':tg.initData}});
+                const page=await r.json();
+                ordersCursor=r.headers.get('X-Next-Cursor');
+                orders=more?orders.concat(page):page;
                 document.getElementById('ordersCount').textContent=orders.length;
                 document.getElementById('statOrders').textContent=orders.length;
                 if(!orders.length){list.innerHTML='<div class="empty"><div class="empty-icon">🔍</div><div class="empty-text">Нет заказов</div></div>';return;}
-                list.innerHTML=orders.map(o=>createOrderCard(o)).join('');
+                list.innerHTML=orders.map(o=>createOrderCard(o)).join('')+(ordersCursor?'<button class="btn btn-secondary" onclick="loadOrders(true)">Показать ещё</button>':'');
             }catch(e){list.innerHTML='<div class="empty">Ошибка загрузки</div>';}
         }
         
+        function startOrderStream(){
+            const after=orders.reduce((m,o)=>Math.max(m,o.id),0);
+            if(window.EventSource){
+                // При переподключении EventSource сам пришлёт Last-Event-ID
+                const es=new EventSource(API+'/api/orders/stream?after='+after);
+                es.addEventListener('order',e=>addLiveOrder(JSON.parse(e.data)));
+                return;
+            }
+            (async()=>{
+                let last=after;
+                while(true){
+                    try{
+                        const r=await fetch(API+'/api/orders/stream?after='+last);
+                        const page=await r.json();
+                        page.forEach(o=>{addLiveOrder(o);last=Math.max(last,o.id);});
+                    }catch(e){await new Promise(s=>setTimeout(s,5000));}
+                }
+            })();
+        }
+        
+        function addLiveOrder(o){
+            if(orders.some(x=>x.id===o.id))return;
+            orders.unshift(o);
+            document.getElementById('ordersCount').textContent=orders.length;
+            const list=document.getElementById('ordersList');
+            if(list.querySelector('.empty'))list.innerHTML='';
+            list.insertAdjacentHTML('afterbegin',createOrderCard(o));
+        }
+        
         function createOrderCard(o){
             const srcMap={hh:'🔴',kwork:'🟢','fl.ru':'🔵','freelance.ru':'🟣'};
             const srcClass=o.source.replace('.','').replace('_','');
@@ -1051,11 +1274,23 @@ WEBAPP_HTML = '''<!DOCTYPE html>
         async function turboParse(){
             const btn=document.getElementById('turboBtn');
             btn.disabled=true;
-            document.getElementById('turboText').textContent='ИЩЕМ...';
+            const text=document.getElementById('turboText');
+            text.textContent='ИЩЕМ...';
             haptic('heavy');
             try{
-                const r=await fetch(API+'/api/turbo-parse',{method:'POST'});
-                const d=await r.json();
+                const r=await fetch(API+'/api/turbo-parse',{method:'POST',headers:{'X-Telegram-Init-Data':tg.initData,'Accept':'application/x-ndjson'}});
+                if(!r.ok)throw new Error(r.status);
+                // Прогресс обхода приходит построчно: {done,total,new_orders,finished}
+                const reader=r.body.getReader(),decoder=new TextDecoder();
+                let buf='',d=null;
+                while(true){
+                    const {value,done}=await reader.read();
+                    if(done)break;
+                    buf+=decoder.decode(value,{stream:true});
+                    const lines=buf.split('\\n');buf=lines.pop();
+                    for(const line of lines){if(line){d=JSON.parse(line);text.textContent='ИЩЕМ... '+d.done+'/'+d.total;}}
+                }
+                if(!d||!d.finished||d.error)throw new Error('turbo');
                 toast('✅ Найдено '+d.new_orders+' заказов!');
                 haptic('success');
                 await loadOrders();
@@ -19,6 +19,8 @@ def get_database_url() -> str:
 class Config:
     # Telegram
     BOT_TOKEN = os.getenv("BOT_TOKEN")
+    # Telegram ID админов через запятую (мониторинг, безлимитный доступ)
+    ADMIN_IDS = {int(admin_id) for admin_id in os.getenv("ADMIN_IDS", "").split(",") if admin_id.strip()}
     
     # GigaChat
     GIGACHAT_AUTH_KEY = os.getenv("GIGACHAT_AUTH_KEY")
@@ -50,7 +52,86 @@ class Config:
     WEBAPP_PORT = int(os.getenv("PORT", 8080))
     
     # Parsing
-    PARSE_INTERVAL = 60
+    PARSE_INTERVAL = 60  # Начальный интервал опроса, дальше его подстраивает services/polling.py
+    POLL_TICK = 5  # Как часто проверять, каким парам пора опрашиваться
+    POLL_MIN_INTERVAL = int(os.getenv("POLL_MIN_INTERVAL", 20))
+    POLL_MAX_INTERVAL = int(os.getenv("POLL_MAX_INTERVAL", 600))
+    POLL_TARGET_NEW = 1.0  # Сколько новых заказов в среднем ждём от одного опроса
+    POLL_EWMA_ALPHA = 0.3
+    POLL_JITTER = 0.1  # ±10% к интервалу
+    PARSE_CONCURRENCY = int(os.getenv("PARSE_CONCURRENCY", 8))  # Всего одновременных запросов
+    PARSE_PER_SOURCE_CONCURRENCY = int(os.getenv("PARSE_PER_SOURCE_CONCURRENCY", 2))  # На одну биржу
+    
+    # HTTP-пул парсеров (общий на всё приложение)
+    HTTP_POOL_LIMIT = 50
+    HTTP_POOL_LIMIT_PER_HOST = 4
+    HTTP_DNS_CACHE_TTL = 300
+    # Дольше самого редкого опроса пары, чтобы соединения тихих бирж доживали до следующего.
+    # Цена — простаивающие сокеты; закрытые биржей раньше пул просто откроет заново
+    HTTP_KEEPALIVE_TIMEOUT = POLL_MAX_INTERVAL + 15
+    
+    # Предохранитель на биржу: размыкается при CIRCUIT_FAILURE_RATE ошибок в окне
+    CIRCUIT_WINDOW = 10
+    CIRCUIT_MIN_CALLS = 3
+    CIRCUIT_FAILURE_RATE = 0.5
+    CIRCUIT_BASE_BACKOFF = 60  # Пауза после первого размыкания, дальше удваивается
+    CIRCUIT_MAX_BACKOFF = 1800
+    CIRCUIT_HALF_OPEN_SUCCESSES = 2
+    
+    # Окно уже виденных заказов (на биржу)
+    SEEN_IDS_WINDOW = int(os.getenv("SEEN_IDS_WINDOW", 5000))
+    SEEN_IDS_FP_RATE = float(os.getenv("SEEN_IDS_FP_RATE", 0.001))  # Доля новых заказов, ошибочно принятых за виденные
+    
+    # Поиск кросс-постов: окно последних заказов и порог похожести текстов (Жаккар по MinHash)
+    DEDUP_WINDOW = int(os.getenv("DEDUP_WINDOW", 50000))
+    DEDUP_THRESHOLD = 0.7
+    
+    # Таблица получателей уведомлений (пересобирается и при изменении настроек)
+    ROUTING_TTL = 300
+    
+    # Очередь уведомлений (лимиты Telegram: ~30 сообщений/с всего, ~1/с в один чат)
+    DELIVERY_WORKERS = int(os.getenv("DELIVERY_WORKERS", 4))
+    DELIVERY_RATE = 25  # Сообщений в секунду, с запасом до лимита
+    DELIVERY_PER_CHAT_INTERVAL = 1.0
+    DELIVERY_MAX_RETRIES = 3
+    DELIVERY_QUEUE_SIZE = 10000
+    DELIVERY_FLUSH_SIZE = 100  # Доставленные пары пишутся в sent_orders пачками
+    DELIVERY_FLUSH_INTERVAL = 2
+    
+    # Готовые тексты уведомлений (order_id, вариант)
+    RENDER_CACHE_SIZE = 2000
+    
+    # Скам-анализ и сложность считаются вне event loop: thread или process, 0 воркеров — прямо в loop
+    ANALYSIS_EXECUTOR = os.getenv("ANALYSIS_EXECUTOR", "thread")
+    ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", 2))
+    ANALYSIS_CHUNK = 50  # Заказов в одной задаче пула
+    
+    # Лента заказов /api/orders
+    ORDERS_PAGE_SIZE = 50
+    ORDERS_PAGE_MAX = 100
+    
+    # Живая лента /api/orders/stream (SSE и long-poll)
+    STREAM_BUFFER = 100  # Событий в буфере одного соединения
+    STREAM_HEARTBEAT = 15  # Комментарий-пинг в тишине, чтобы прокси не рвали соединение
+    STREAM_POLL_TIMEOUT = 25
+    STREAM_REPLAY_LIMIT = 50  # Сколько пропущенных заказов досылать после переподключения
+    
+    # Турбо-парсинг по кнопке: один обход на всех, итог отдаётся повторно в течение TURBO_COOLDOWN (сек)
+    TURBO_COOLDOWN = 60
+    TURBO_PROGRESS_INTERVAL = 3  # Как часто обновлять сообщение с прогрессом в боте
+    
+    # Mini App: проверенные initData (сек) и отложенная запись активности пользователей
+    AUTH_CACHE_TTL = 300
+    AUTH_CACHE_SIZE = 10000
+    ACTIVITY_FLUSH_INTERVAL = 300  # Не чаще раза на пользователя за интервал
+    
+    # Пересчёт анализа заказов после изменения правил (фоновыми пачками)
+    RESCORE_INTERVAL = 60
+    RESCORE_BATCH = 500
+    
+    @classmethod
+    def is_admin(cls, telegram_id: int) -> bool:
+        return telegram_id in cls.ADMIN_IDS
     
     @classmethod
     def get_subscription_config(cls, sub_type: str) -> dict:
@@ -1,6 +1,6 @@
 # database/__init__.py
 from .db import Database, init_db, async_session, engine
-from .models import Base, User, Order, Payment, SentOrder
+from .models import Base, User, Order, Payment, SentOrder, UserCategory
 
 __all__ = [
     'Database',
@@ -11,5 +11,6 @@ __all__ = [
     'User',
     'Order', 
     'Payment',
-    'SentOrder'
+    'SentOrder',
+    'UserCategory'
 ]
\ No newline at end of file
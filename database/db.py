@@ -1,7 +1,10 @@
 # database/db.py
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy import select, func, and_, text, update
-from database.models import Base, User, Order, Payment, SentOrder, Deal, Income, Achievement
+from sqlalchemy import select, func, and_, text, update, delete, tuple_, inspect
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from database.models import Base, User, Order, Payment, SentOrder, Deal, Income, Achievement, UserCategory
 from config import Config
 from typing import Optional, List, Dict
 from datetime import datetime, timedelta
@@ -42,17 +45,119 @@ async def run_migrations():
         "ALTER TABLE orders ADD COLUMN IF NOT EXISTS scam_warnings JSON DEFAULT '[]'",
         "ALTER TABLE orders ADD COLUMN IF NOT EXISTS views_count INTEGER DEFAULT 0",
         "ALTER TABLE orders ADD COLUMN IF NOT EXISTS responses_count INTEGER DEFAULT 0",
+        "ALTER TABLE orders ADD COLUMN IF NOT EXISTS fingerprint BYTEA",
+        "ALTER TABLE orders ADD COLUMN IF NOT EXISTS cluster_id BIGINT",
+        "CREATE INDEX IF NOT EXISTS ix_orders_cluster_id ON orders (cluster_id)",
+        "ALTER TABLE orders ADD COLUMN IF NOT EXISTS scam_green_signs JSON DEFAULT '[]'",
+        "ALTER TABLE orders ADD COLUMN IF NOT EXISTS complexity VARCHAR(20)",
+        "ALTER TABLE orders ADD COLUMN IF NOT EXISTS complexity_multiplier FLOAT",
+        "ALTER TABLE orders ADD COLUMN IF NOT EXISTS analysis_version VARCHAR(16)",
+        "CREATE INDEX IF NOT EXISTS ix_orders_analysis_version ON orders (analysis_version)",
+        "CREATE INDEX IF NOT EXISTS ix_orders_created_at_id ON orders (created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_orders_category_created_at_id ON orders (category, created_at, id)",
+        "ALTER TABLE orders ADD COLUMN IF NOT EXISTS base_score INTEGER",
+        "ALTER TABLE orders ADD COLUMN IF NOT EXISTS rank_key DOUBLE PRECISION",
+        "CREATE INDEX IF NOT EXISTS ix_orders_rank_key_id ON orders (rank_key, id)",
+        "CREATE INDEX IF NOT EXISTS ix_orders_category_rank_key_id ON orders (category, rank_key, id)",
         
         # Payment fields
         "ALTER TABLE payments ADD COLUMN IF NOT EXISTS subscription_type VARCHAR(20) DEFAULT 'basic'",
     ]
     
-    async with engine.begin() as conn:
+    async with engine.connect() as conn:
+        # Каждая миграция в своей транзакции: в Postgres ошибка одной откатила бы и все остальные
         for migration in migrations:
             try:
-                await conn.execute(text(migration))
+                async with conn.begin():
+                    await conn.execute(text(migration))
             except Exception as e:
                 logger.debug(f"Migration skipped: {e}")
+        
+        await _add_missing_columns(conn)
+        
+        for table, name, columns, dedup in UNIQUE_INDEXES:
+            await _create_unique_index(conn, table, name, columns, dedup)
+
+
+# Дубли заказа (source, external_id), кроме самого раннего
+_DUPLICATE_ORDER_IDS = (
+    "SELECT id FROM orders WHERE id NOT IN "
+    "(SELECT MIN(id) FROM orders GROUP BY source, external_id)"
+)
+# Самый ранний заказ с теми же (source, external_id), что и {table}.order_id
+_KEPT_ORDER_ID = (
+    "(SELECT MIN(kept.id) FROM orders dup JOIN orders kept "
+    "ON kept.source = dup.source AND kept.external_id = dup.external_id "
+    "WHERE dup.id = {table}.order_id)"
+)
+
+# Уникальные индексы, которых нет в старых БД: (таблица, индекс, колонки, запросы, убирающие дубли)
+UNIQUE_INDEXES = [
+    ("orders", "uq_orders_source_external_id", "source, external_id", [
+        # Ссылки на дубли переводим на оставшийся заказ
+        f"UPDATE sent_orders SET order_id = {_KEPT_ORDER_ID.format(table='sent_orders')} "
+        f"WHERE order_id IN ({_DUPLICATE_ORDER_IDS})",
+        f"UPDATE deals SET order_id = {_KEPT_ORDER_ID.format(table='deals')} "
+        f"WHERE order_id IN ({_DUPLICATE_ORDER_IDS})",
+        f"DELETE FROM orders WHERE id IN ({_DUPLICATE_ORDER_IDS})",
+    ]),
+    # После orders: перенос ссылок на оставшийся заказ тоже мог дать дубли
+    ("sent_orders", "uq_sent_orders_user_order", "user_id, order_id", [
+        "DELETE FROM sent_orders WHERE id NOT IN "
+        "(SELECT MIN(id) FROM sent_orders GROUP BY user_id, order_id)",
+    ]),
+]
+
+
+async def _add_missing_columns(conn):
+    """Добавляет недостающие колонки моделей и их индексы"""
+    def missing_columns(sync_conn) -> List[tuple]:
+        inspector = inspect(sync_conn)
+        missing = []
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            missing += [(table, column) for column in table.columns if column.name not in existing]
+        return missing
+    
+    async with conn.begin():
+        missing = await conn.run_sync(missing_columns)
+    
+    for table, column in missing:
+        try:
+            async with conn.begin():
+                column_type = column.type.compile(dialect=conn.dialect)
+                await conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                for index in table.indexes:
+                    if column in index.columns.values():
+                        await conn.run_sync(lambda sync_conn: index.create(sync_conn, checkfirst=True))
+            logger.info(f"Added column {table.name}.{column.name}")
+        except Exception as e:
+            logger.warning(f"Column {table.name}.{column.name} was not added: {e}")
+
+
+async def _create_unique_index(conn, table: str, name: str, columns: str, dedup: List[str]):
+    """Удаляет дубли и создаёт уникальный индекс в отдельной транзакции"""
+    def index_exists(sync_conn) -> bool:
+        inspector = inspect(sync_conn)
+        names = {index['name'] for index in inspector.get_indexes(table)}
+        names |= {constraint['name'] for constraint in inspector.get_unique_constraints(table)}
+        return name in names
+    
+    try:
+        async with conn.begin():
+            if await conn.run_sync(index_exists):
+                return
+            removed = 0
+            for statement in dedup:
+                result = await conn.execute(text(statement))
+                if statement.startswith("DELETE"):
+                    removed += result.rowcount
+            await conn.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+        logger.info(f"Created unique index {name}, removed {removed} duplicate rows")
+    except Exception as e:
+        logger.warning(f"Unique index {name} was not created: {e}")
 
 
 async def init_db():
@@ -61,6 +166,8 @@ async def init_db():
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
         await run_migrations()
+        await Database.backfill_user_categories()
+        await Database.backfill_order_ranks()
         logger.info("Database initialized successfully")
     except Exception as e:
         logger.error(f"Database init error: {e}")
@@ -76,6 +183,14 @@ def generate_referral_code() -> str:
 class Database:
     """Основной класс для работы с БД"""
     
+    # Растёт при изменении категорий, настроек и подписок — по нему
+    # services.routing понимает, что таблицу получателей пора пересобрать
+    users_version = 0
+    
+    @staticmethod
+    def _users_changed():
+        Database.users_version += 1
+    
     # ============ USER ============
     
     @staticmethod
@@ -111,26 +226,31 @@ class Database:
     @staticmethod
     async def update_user_activity(telegram_id: int):
         """Обновляет активность и streak"""
+        await Database.update_users_activity({telegram_id: [datetime.utcnow()]})
+    
+    @staticmethod
+    async def update_users_activity(activity: Dict[int, List[datetime]]):
+        """Активность нескольких пользователей одной транзакцией: telegram_id -> моменты по порядку"""
+        if not activity:
+            return
         async with async_session() as session:
             result = await session.execute(
-                select(User).where(User.telegram_id == telegram_id)
+                select(User).where(User.telegram_id.in_(list(activity)))
             )
-            user = result.scalar_one_or_none()
-            if user:
-                now = datetime.utcnow()
-                
-                # Проверяем streak
-                if user.last_active:
-                    diff = (now - user.last_active).days
-                    if diff == 1:
-                        user.streak_days += 1
-                    elif diff > 1:
+            for user in result.scalars().all():
+                for now in activity[user.telegram_id]:
+                    # Проверяем streak
+                    if user.last_active:
+                        diff = (now - user.last_active).days
+                        if diff == 1:
+                            user.streak_days += 1
+                        elif diff > 1:
+                            user.streak_days = 1
+                    else:
                         user.streak_days = 1
-                else:
-                    user.streak_days = 1
-                
-                user.last_active = now
-                await session.commit()
+                    
+                    user.last_active = now
+            await session.commit()
     
     @staticmethod
     async def update_user_categories(telegram_id: int, categories: List[str]):
@@ -141,7 +261,9 @@ class Database:
             user = result.scalar_one_or_none()
             if user:
                 user.categories = categories
+                await Database._sync_user_categories(session, user.id, categories)
                 await session.commit()
+                Database._users_changed()
     
     @staticmethod
     async def update_user_settings(telegram_id: int, **kwargs):
@@ -155,7 +277,62 @@ class Database:
                 for key, value in kwargs.items():
                     if hasattr(user, key):
                         setattr(user, key, value)
+                if 'categories' in kwargs:
+                    await Database._sync_user_categories(session, user.id, kwargs['categories'] or [])
                 await session.commit()
+                Database._users_changed()
+    
+    @staticmethod
+    async def _sync_user_categories(session, user_id: int, categories: List[str]):
+        """Переписывает строки user_categories пользователя (в текущей транзакции)"""
+        await session.execute(delete(UserCategory).where(UserCategory.user_id == user_id))
+        for category in dict.fromkeys(categories):
+            session.add(UserCategory(user_id=user_id, category=category))
+    
+    @staticmethod
+    async def backfill_user_categories():
+        """Заполняет user_categories из users.categories, если таблица пустая"""
+        async with async_session() as session:
+            has_rows = await session.execute(select(UserCategory.id).limit(1))
+            if has_rows.scalar_one_or_none() is not None:
+                return
+            
+            result = await session.execute(select(User.id, User.categories))
+            count = 0
+            for user_id, categories in result.all():
+                for category in dict.fromkeys(categories or []):
+                    session.add(UserCategory(user_id=user_id, category=category))
+                    count += 1
+            await session.commit()
+            if count:
+                logger.info(f"Backfilled {count} user categories")
+    
+    @staticmethod
+    async def backfill_order_ranks():
+        """Заполняет base_score и rank_key у заказов, сохранённых до ранжирования"""
+        from services.ranking import base_score, rank_key
+        total = 0
+        async with async_session() as session:
+            while True:
+                result = await session.execute(
+                    select(Order.id, Order.budget_value, Order.created_at)
+                    .where(Order.rank_key.is_(None))
+                    .order_by(Order.id)
+                    .limit(1000)
+                )
+                rows = result.all()
+                if not rows:
+                    break
+                updates = []
+                for order_id, budget_value, created_at in rows:
+                    score = base_score(budget_value)
+                    created_at = created_at or datetime.utcnow()
+                    updates.append({'id': order_id, 'base_score': score, 'rank_key': rank_key(score, created_at)})
+                await session.execute(update(Order), updates)
+                await session.commit()
+                total += len(updates)
+        if total:
+            logger.info(f"Backfilled ranking of {total} orders")
     
     @staticmethod
     async def start_user_trial(telegram_id: int, subscription_type: str = "basic"):
@@ -169,6 +346,7 @@ class Database:
                 user.subscription_type = subscription_type
                 user.trial_used = True
                 await session.commit()
+                Database._users_changed()
                 return True
             return False
     
@@ -186,6 +364,7 @@ class Database:
                 else:
                     user.subscription_end = datetime.utcnow() + timedelta(days=days)
                 await session.commit()
+                Database._users_changed()
 
     @staticmethod
     async def is_admin(telegram_id: int) -> bool:
@@ -341,6 +520,81 @@ class Database:
             await session.refresh(order)
             return order
     
+    @staticmethod
+    async def save_orders_bulk(orders_data: List[dict]) -> List[Order]:
+        """Пакетно сохраняет заказы, возвращает только новые"""
+        if not orders_data:
+            return []
+        
+        dialect_insert = {"postgresql": pg_insert, "sqlite": sqlite_insert}.get(engine.dialect.name)
+        if dialect_insert is None:
+            return await Database._save_orders_one_by_one(orders_data)
+        
+        # Только колонки Order и без повторов внутри пачки
+        columns = set(Order.__table__.columns.keys())
+        rows = {}
+        for order_data in orders_data:
+            key = (order_data['source'], order_data['external_id'])
+            if key not in rows:
+                rows[key] = {k: v for k, v in order_data.items() if k in columns}
+        
+        stmt = (
+            dialect_insert(Order)
+            .on_conflict_do_nothing(index_elements=["source", "external_id"])
+            .returning(Order)
+        )
+        
+        try:
+            async with async_session() as session:
+                result = await session.scalars(stmt, list(rows.values()))
+                orders = result.all()
+                await session.commit()
+                return orders
+        except (OperationalError, ProgrammingError) as e:
+            # Нет уникального индекса (старая БД с дублями) — сохраняем по одному
+            logger.warning(f"Bulk order insert failed, falling back to one by one: {e}")
+            return await Database._save_orders_one_by_one(list(rows.values()))
+    
+    @staticmethod
+    async def _save_orders_one_by_one(orders_data: List[dict]) -> List[Order]:
+        saved = []
+        for order_data in orders_data:
+            order = await Database.save_order(order_data)
+            if order:
+                saved.append(order)
+        return saved
+    
+    @staticmethod
+    async def get_recent_external_ids(source: str, limit: int) -> List[str]:
+        """Последние external_id биржи, новые первыми"""
+        async with async_session() as session:
+            result = await session.execute(
+                select(Order.external_id)
+                .where(Order.source == source)
+                .order_by(Order.id.desc())
+                .limit(limit)
+            )
+            return list(result.scalars().all())
+    
+    @staticmethod
+    async def get_recent_fingerprints(limit: int) -> List[tuple]:
+        """(fingerprint, cluster_id) последних заказов, новые первыми"""
+        async with async_session() as session:
+            result = await session.execute(
+                select(Order.fingerprint, Order.cluster_id)
+                .where(Order.fingerprint.isnot(None))
+                .order_by(Order.id.desc())
+                .limit(limit)
+            )
+            return [tuple(row) for row in result.all()]
+    
+    @staticmethod
+    async def get_max_cluster_id() -> int:
+        """Наибольший выданный cluster_id (0, если кластеров ещё нет)"""
+        async with async_session() as session:
+            result = await session.execute(select(func.max(Order.cluster_id)))
+            return result.scalar() or 0
+    
     @staticmethod
     async def get_order_by_id(order_id: int) -> Optional[Order]:
         async with async_session() as session:
@@ -358,6 +612,48 @@ class Database:
             result = await session.execute(query)
             return result.scalars().all()
     
+    @staticmethod
+    async def get_orders_page(category: str = None, source: str = None, min_budget: int = None,
+                              max_scam: int = None, before: tuple = None, limit: int = 50,
+                              sort: str = 'new', user: User = None, now: datetime = None) -> List:
+        """Страница ленты: строки (Order, ai_score, hot, sort_key) после before"""
+        from services.ranking import score_expr, sort_key_expr, hot_expr
+        
+        sort_key = sort_key_expr(user) if sort == 'score' else Order.created_at
+        async with async_session() as session:
+            query = select(
+                Order,
+                score_expr(now or datetime.utcnow(), user).label('ai_score'),
+                hot_expr().label('hot'),
+                sort_key.label('sort_key'),
+            )
+            if category:
+                query = query.where(Order.category == category)
+            if source:
+                query = query.where(Order.source == source)
+            if min_budget:
+                query = query.where(Order.budget_value >= min_budget)
+            if max_scam is not None:
+                query = query.where(func.coalesce(Order.scam_score, 0) <= max_scam)
+            if before:
+                query = query.where(tuple_(sort_key, Order.id) < tuple_(*before))
+            query = query.order_by(sort_key.desc(), Order.id.desc()).limit(limit)
+            result = await session.execute(query)
+            return result.all()
+    
+    @staticmethod
+    async def get_orders_since(after_id: int, category: str = None, min_budget: int = 0,
+                               limit: int = 50) -> List[Order]:
+        """Заказы новее after_id (досылка живой ленты после переподключения), по порядку"""
+        async with async_session() as session:
+            query = select(Order).where(Order.id > after_id)
+            if category:
+                query = query.where(Order.category == category)
+            if min_budget:
+                query = query.where(Order.budget_value >= min_budget)
+            result = await session.execute(query.order_by(Order.id).limit(limit))
+            return result.scalars().all()
+    
     @staticmethod
     async def update_order_scam(order_id: int, scam_score: int, warnings: List[str]):
         """Обновляет scam-данные заказа"""
@@ -371,6 +667,27 @@ class Database:
                 order.scam_warnings = warnings
                 await session.commit()
     
+    @staticmethod
+    async def get_orders_to_rescore(version: str, limit: int) -> List[Order]:
+        """Заказы, проанализированные другой версией правил (или ещё ни разу), новые первыми"""
+        async with async_session() as session:
+            result = await session.execute(
+                select(Order)
+                .where((Order.analysis_version != version) | Order.analysis_version.is_(None))
+                .order_by(Order.id.desc())
+                .limit(limit)
+            )
+            return result.scalars().all()
+    
+    @staticmethod
+    async def update_orders_analysis(rows: List[dict]):
+        """Пакетно записывает анализ заказов: словари с id и колонками анализа"""
+        if not rows:
+            return
+        async with async_session() as session:
+            await session.execute(update(Order), rows)
+            await session.commit()
+    
     @staticmethod
     async def increment_order_views(order_id: int):
         async with async_session() as session:
@@ -546,6 +863,7 @@ class Database:
                     user.subscription_type = payment.subscription_type
                     
                     await session.commit()
+                    Database._users_changed()
                     return user
             return None
     
@@ -581,17 +899,76 @@ class Database:
             )
             return result.scalar_one_or_none() is not None
     
+    @staticmethod
+    async def get_unsent_user_ids(order_id: int, user_ids: List[int], cluster_id: int = None) -> set:
+        """Кому из user_ids заказ и его дубли ещё не отправлялись"""
+        if not user_ids:
+            return set()
+        async with async_session() as session:
+            query = select(SentOrder.user_id).where(SentOrder.user_id.in_(user_ids))
+            if cluster_id is not None:
+                query = query.join(Order, Order.id == SentOrder.order_id).where(Order.cluster_id == cluster_id)
+            else:
+                query = query.where(SentOrder.order_id == order_id)
+            result = await session.execute(query)
+            return set(user_ids) - set(result.scalars().all())
+    
+    @staticmethod
+    async def mark_orders_sent_bulk(pairs: List[tuple]):
+        """Отмечает отправку пачкой пар (user_id, order_id), повторы пропускаются"""
+        if not pairs:
+            return
+        
+        dialect_insert = {"postgresql": pg_insert, "sqlite": sqlite_insert}.get(engine.dialect.name)
+        if dialect_insert is None:
+            for user_id, order_id in pairs:
+                await Database.mark_order_sent(user_id, order_id)
+            return
+        
+        rows = [{"user_id": user_id, "order_id": order_id} for user_id, order_id in dict.fromkeys(pairs)]
+        async with async_session() as session:
+            await session.execute(
+                dialect_insert(SentOrder).on_conflict_do_nothing(index_elements=["user_id", "order_id"]),
+                rows
+            )
+            await session.commit()
+    
     @staticmethod
     async def get_active_users_for_category(category: str) -> List[User]:
         async with async_session() as session:
             result = await session.execute(
-                select(User).where(
+                select(User)
+                .join(UserCategory, UserCategory.user_id == User.id)
+                .where(
+                    UserCategory.category == category,
+                    User.is_active == True,
+                    User.subscription_end > datetime.utcnow()
+                )
+            )
+            return result.scalars().all()
+    
+    @staticmethod
+    async def get_routing_rows() -> List[tuple]:
+        """Активные подписчики с их категориями для routing_index"""
+        async with async_session() as session:
+            result = await session.execute(
+                select(
+                    UserCategory.category,
+                    User.id,
+                    User.telegram_id,
+                    User.min_budget,
+                    User.predator_mode,
+                    User.predator_min_budget,
+                    User.subscription_type,
+                    User.subscription_end,
+                )
+                .join(User, User.id == UserCategory.user_id)
+                .where(
                     User.is_active == True,
                     User.subscription_end > datetime.utcnow()
                 )
             )
-            users = result.scalars().all()
-            return [u for u in users if category in (u.categories or [])]
+            return result.all()
     
     # ============ ANALYTICS ============
     
@@ -1,6 +1,6 @@
 # database/models.py
 from datetime import datetime, timedelta
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, ForeignKey, JSON, BigInteger, Text
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, ForeignKey, JSON, BigInteger, Text, UniqueConstraint, Index, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -117,6 +117,19 @@ class User(Base):
         return len(levels)
 
 
+class UserCategory(Base):
+    """Категории пользователя в нормализованном виде (маршрутизация уведомлений)"""
+    __tablename__ = "user_categories"
+    __table_args__ = (
+        UniqueConstraint("user_id", "category", name="uq_user_categories_user_category"),
+        Index("ix_user_categories_category", "category"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    category = Column(String(100), nullable=False)
+
+
 class Payment(Base):
     __tablename__ = "payments"
     
@@ -136,6 +149,15 @@ class Payment(Base):
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        UniqueConstraint("source", "external_id", name="uq_orders_source_external_id"),
+        # Лента /api/orders: keyset по (created_at, id), общая и по категории
+        Index("ix_orders_created_at_id", "created_at", "id"),
+        Index("ix_orders_category_created_at_id", "category", "created_at", "id"),
+        # Сортировка по оценке: keyset по (rank_key, id)
+        Index("ix_orders_rank_key_id", "rank_key", "id"),
+        Index("ix_orders_category_rank_key_id", "category", "rank_key", "id"),
+    )
     
     id = Column(Integer, primary_key=True)
     external_id = Column(String(255), nullable=False)
@@ -151,6 +173,19 @@ class Order(Base):
     # Scam Detection
     scam_score = Column(Integer, default=0)
     scam_warnings = Column(JSON, default=list)
+    scam_green_signs = Column(JSON, default=list)
+    complexity = Column(String(20), nullable=True)  # low, medium, high (PriceCalculator)
+    complexity_multiplier = Column(Float, nullable=True)
+    # Хеш правил, которыми посчитан анализ (services/ingest.py); при смене правил заказ пересчитывается
+    analysis_version = Column(String(16), nullable=True, index=True)
+    
+    # Кросс-постинг: MinHash текста и кластер почти одинаковых заказов (services/dedup.py)
+    fingerprint = Column(LargeBinary(64), nullable=True)
+    cluster_id = Column(BigInteger, nullable=True, index=True)
+    
+    # Ранжирование (services/ranking.py): оценка без учёта времени и ключ сортировки с затуханием
+    base_score = Column(Integer, nullable=True)
+    rank_key = Column(Float, nullable=True)
     
     # Analytics
     views_count = Column(Integer, default=0)
@@ -162,6 +197,9 @@ class Order(Base):
 
 class SentOrder(Base):
     __tablename__ = "sent_orders"
+    __table_args__ = (
+        UniqueConstraint("user_id", "order_id", name="uq_sent_orders_user_order"),
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -1,5 +1,7 @@
 # parsers/__init__.py
-from .base import BaseParser
+from .base import BaseParser, HTML_BACKENDS, make_document
+from .http_pool import http_pool, HttpPool
+from .circuit_breaker import circuit_breakers, CircuitBreaker
 from .kwork import KworkParser
 from .fl_ru import FLRuParser
 from .habr_freelance import HabrFreelanceParser
@@ -16,6 +18,12 @@ ALL_PARSERS = [
 
 __all__ = [
     'BaseParser',
+    'HTML_BACKENDS',
+    'make_document',
+    'HttpPool',
+    'http_pool',
+    'CircuitBreaker',
+    'circuit_breakers',
     'KworkParser', 
     'FLRuParser',
     'HabrFreelanceParser',
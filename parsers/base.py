@@ -1,11 +1,84 @@
 # parsers/base.py
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from contextvars import ContextVar
+from typing import List, Dict, Any, Optional, Tuple, Callable
 import aiohttp
+import asyncio
+import hashlib
 import logging
+from .http_pool import http_pool
+from .circuit_breaker import circuit_breakers, is_failure_status, CircuitBreaker
 
 logger = logging.getLogger(__name__)
 
+# Доступные бэкенды HTML-парсинга (от медленного к быстрому)
+HTML_BACKENDS = ("html.parser", "lxml", "selectolax")
+
+# Действия опроса, которые можно выполнить только после записи его заказов в БД
+# (валидаторы страниц, курсоры). Список задаёт ParseEngine на время parse_orders
+deferred_commits: ContextVar[Optional[List[Callable[[], None]]]] = ContextVar("deferred_commits", default=None)
+
+
+def defer_until_saved(action: Callable[[], None]):
+    """Выполняет action после записи заказов текущего опроса, вне ParseEngine — сразу"""
+    pending = deferred_commits.get()
+    if pending is None:
+        action()
+    else:
+        pending.append(action)
+
+
+class _SelectolaxNode:
+    """Обёртка над узлом selectolax с API BeautifulSoup, который используют парсеры"""
+    
+    __slots__ = ("_node",)
+    
+    def __init__(self, node):
+        self._node = node
+    
+    def select(self, selector: str) -> List["_SelectolaxNode"]:
+        return [_SelectolaxNode(node) for node in self._descendants(selector)]
+    
+    def select_one(self, selector: str) -> Optional["_SelectolaxNode"]:
+        for node in self._descendants(selector):
+            return _SelectolaxNode(node)
+        return None
+    
+    def _descendants(self, selector: str):
+        # В отличие от soupsieve, lexbor может вернуть сам узел и повторяет
+        # узел для каждого совпавшего селектора из группы "a, b"
+        seen = {self._node.mem_id}
+        for node in self._node.css(selector):
+            if node.mem_id not in seen:
+                seen.add(node.mem_id)
+                yield node
+    
+    def get_text(self, strip: bool = False) -> str:
+        return self._node.text(deep=True, separator="", strip=strip)
+    
+    def get(self, attr: str, default=None):
+        value = self._node.attributes.get(attr)
+        return default if value is None else value
+
+
+def make_document(html: str, backend: str = "lxml"):
+    """Документ выбранным HTML-бэкендом: select / select_one / get_text / get"""
+    if backend == "selectolax":
+        try:
+            from selectolax.lexbor import LexborHTMLParser
+        except ImportError:
+            # selectolax — опциональная зависимость
+            logger.debug("selectolax is not installed, falling back to lxml")
+            backend = "lxml"
+        else:
+            return _SelectolaxNode(LexborHTMLParser(html).root)
+    
+    if backend not in HTML_BACKENDS:
+        raise ValueError(f"Unknown HTML backend: {backend}")
+    
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, backend)
+
 
 class BaseParser(ABC):
     """Базовый класс для парсеров бирж"""
@@ -13,21 +86,100 @@ class BaseParser(ABC):
     SOURCE_NAME = "base"
     BASE_URL = ""
     
+    # Статус, которым fetch_page сообщает «страница не менялась»
+    NOT_MODIFIED = 304
+    
+    # Бэкенд HTML-парсинга, см. HTML_BACKENDS и benchmarks/html_backends.py
+    HTML_BACKEND = "lxml"
+    
     def __init__(self):
-        self.session = None
+        # url -> (ETag, Last-Modified, хеш тела) последней обработанной страницы
+        self._page_validators: Dict[str, Tuple[Optional[str], Optional[str], bytes]] = {}
+        # Скачанные, но ещё не обработанные страницы
+        self._fetched_validators: Dict[str, Tuple[Optional[str], Optional[str], bytes]] = {}
+    
+    @property
+    def breaker(self) -> CircuitBreaker:
+        """Предохранитель биржи: fetch_page / fetch_json сообщают ему исход каждого запроса"""
+        return circuit_breakers.get(self.SOURCE_NAME)
+    
+    def _record_status(self, status: int):
+        if is_failure_status(status):
+            self.breaker.record_failure(f"HTTP {status}")
+        else:
+            self.breaker.record_success()
     
     async def get_session(self) -> aiohttp.ClientSession:
-        if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession(
-                headers={
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-                }
-            )
-        return self.session
+        """Общая сессия из пула приложения (keep-alive между тиками)"""
+        return await http_pool.get_session()
     
     async def close(self):
-        if self.session and not self.session.closed:
-            await self.session.close()
+        """Сессия общая — её закрывает приложение через http_pool.close()"""
+        pass
+    
+    async def fetch_page(self, url: str, headers: Dict[str, str] = None,
+                         timeout: int = 15) -> Tuple[int, Optional[str]]:
+        """Условный GET страницы: (status, html) или (NOT_MODIFIED, None)"""
+        request_headers = dict(headers or {})
+        validators = self._page_validators.get(url)
+        if validators:
+            etag, last_modified, _ = validators
+            if etag:
+                request_headers["If-None-Match"] = etag
+            if last_modified:
+                request_headers["If-Modified-Since"] = last_modified
+        
+        session = await self.get_session()
+        try:
+            async with session.get(url, headers=request_headers,
+                                   timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                self._record_status(response.status)
+                if response.status == 304:
+                    return self.NOT_MODIFIED, None
+                if response.status != 200:
+                    return response.status, None
+                
+                body = await response.read()
+                encoding = response.get_encoding()
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.breaker.record_failure(f"{type(e).__name__}: {e}")
+            raise
+        
+        digest = hashlib.blake2b(body, digest_size=16).digest()
+        
+        # Сервер игнорирует условные запросы, но контент тот же
+        if validators and validators[2] == digest:
+            return self.NOT_MODIFIED, None
+        
+        self._fetched_validators[url] = (etag, last_modified, digest)
+        return 200, body.decode(encoding, errors="replace")
+    
+    def page_parsed(self, url: str):
+        """Страница разобрана: её валидаторы вступят в силу, когда заказы сохранятся"""
+        validators = self._fetched_validators.pop(url, None)
+        if validators is not None:
+            defer_until_saved(lambda: self._page_validators.__setitem__(url, validators))
+    
+    async def fetch_json(self, url: str, params=None, headers: Dict[str, str] = None,
+                         timeout: int = 15) -> Tuple[int, Any]:
+        """GET к JSON API биржи. Возвращает (status, data), data — None, если статус не 200"""
+        session = await self.get_session()
+        try:
+            async with session.get(url, params=params, headers=headers,
+                                   timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                self._record_status(response.status)
+                if response.status != 200:
+                    return response.status, None
+                return 200, await response.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.breaker.record_failure(f"{type(e).__name__}: {e}")
+            raise
+    
+    def parse_html(self, html: str):
+        """Разбирает HTML бэкендом парсера (HTML_BACKEND)"""
+        return make_document(html, self.HTML_BACKEND)
     
     @abstractmethod
     async def parse_orders(self, category: str) -> List[Dict[str, Any]]:
@@ -0,0 +1,130 @@
+# parsers/circuit_breaker.py
+import logging
+import time
+from collections import deque
+from typing import Dict
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Ответы, после которых биржу считаем недоступной (бан, лимит, падение)
+FAILURE_STATUSES = {403, 429}
+
+
+def is_failure_status(status: int) -> bool:
+    return status in FAILURE_STATUSES or status >= 500
+
+
+class CircuitBreaker:
+    """Предохранитель одной биржи: closed -> open -> half_open"""
+
+    def __init__(self, source: str):
+        self.source = source
+        self._state = CLOSED
+        self._outcomes = deque(maxlen=Config.CIRCUIT_WINDOW)
+        self._opened_at = 0.0
+        self._backoff = 0.0
+        self._trips = 0
+        self._probe_in_flight = False
+        self._probe_successes = 0
+        self.rejected = 0
+        self.last_error = None
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self._backoff:
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+            self._probe_successes = 0
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Можно ли сейчас опрашивать биржу. В half_open пропускает один пробный запрос"""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def release_probe(self):
+        """Пробный запрос закончился, не сообщив исход (например, ответ взят из кеша)"""
+        self._probe_in_flight = False
+
+    def record_success(self):
+        self._outcomes.append(True)
+        if self._state == HALF_OPEN:
+            self._probe_in_flight = False
+            self._probe_successes += 1
+            if self._probe_successes >= Config.CIRCUIT_HALF_OPEN_SUCCESSES:
+                self._close()
+
+    def record_failure(self, reason: str = None):
+        self._outcomes.append(False)
+        self.last_error = reason
+        if self._state == HALF_OPEN:
+            self._open()
+        elif self._state == CLOSED and self._should_trip():
+            self._open()
+
+    def _should_trip(self) -> bool:
+        if len(self._outcomes) < Config.CIRCUIT_MIN_CALLS:
+            return False
+        failures = self._outcomes.count(False)
+        return failures / len(self._outcomes) >= Config.CIRCUIT_FAILURE_RATE
+
+    def _open(self):
+        self._trips += 1
+        self._backoff = min(
+            Config.CIRCUIT_BASE_BACKOFF * 2 ** (self._trips - 1),
+            Config.CIRCUIT_MAX_BACKOFF,
+        )
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+        logger.warning(f"Circuit for {self.source} opened for {self._backoff:.0f}s: {self.last_error}")
+
+    def _close(self):
+        self._state = CLOSED
+        self._trips = 0
+        self._backoff = 0.0
+        self._outcomes.clear()
+        logger.info(f"Circuit for {self.source} closed")
+
+    def stats(self) -> Dict:
+        state = self.state
+        total = len(self._outcomes)
+        return {
+            "state": state,
+            "success_rate": round(self._outcomes.count(True) / total, 2) if total else None,
+            "window": total,
+            "trips": self._trips,
+            "retry_in": round(max(0.0, self._opened_at + self._backoff - time.monotonic()), 1) if state == OPEN else 0,
+            "rejected": self.rejected,
+            "last_error": self.last_error,
+        }
+
+
+class CircuitBreakers:
+    """Предохранители по биржам (по SOURCE_NAME)"""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, source: str) -> CircuitBreaker:
+        if source not in self._breakers:
+            self._breakers[source] = CircuitBreaker(source)
+        return self._breakers[source]
+
+    def stats(self) -> Dict:
+        return {source: breaker.stats() for source, breaker in self._breakers.items()}
+
+
+circuit_breakers = CircuitBreakers()
@@ -1,8 +1,6 @@
 # parsers/freelanceru.py
-import aiohttp
 import re
 from typing import List, Dict, Any
-from bs4 import BeautifulSoup
 from .base import BaseParser
 import logging
 
@@ -12,6 +10,7 @@ logger = logging.getLogger(__name__)
 class FreelanceRuParser(BaseParser):
     SOURCE_NAME = "freelance.ru"
     BASE_URL = "https://freelance.ru"
+    HTML_BACKEND = "selectolax"
     
     CATEGORY_MAP = {
         "design": "/projects/?cat=18",
@@ -27,58 +26,65 @@ class FreelanceRuParser(BaseParser):
             path = self.CATEGORY_MAP.get(category, "/projects/")
             url = f"{self.BASE_URL}{path}"
             
-            session = await self.get_session()
+            status, html = await self.fetch_page(url)
+            if status == self.NOT_MODIFIED:
+                logger.debug(f"Freelance.ru: {category} not modified, skipping parse")
+                return orders
+            if status != 200:
+                logger.warning(f"Freelance.ru returned {status}")
+                return orders
+            
+            orders = self._parse_page(html, category)
+            self.page_parsed(url)
             
-            async with session.get(url, timeout=aiohttp.ClientTimeout(total=15)) as response:
-                if response.status != 200:
-                    logger.warning(f"Freelance.ru returned {response.status}")
-                    return orders
-                
-                html = await response.text()
-                soup = BeautifulSoup(html, 'html.parser')
-                
-                projects = soup.select('.project, .project-item, [class*="project"]')[:15]
-                
-                for project in projects:
-                    try:
-                        title_el = project.select_one('a.project-name, .title a, h2 a')
-                        if not title_el:
-                            continue
-                        
-                        title = title_el.get_text(strip=True)
-                        href = title_el.get('href', '')
-                        
-                        if not title or len(title) < 5:
-                            continue
-                        
-                        order_id = re.search(r'/(\d+)', href)
-                        order_id = order_id.group(1) if order_id else href
-                        
-                        price_el = project.select_one('.price, .cost, [class*="price"]')
-                        budget = price_el.get_text(strip=True) if price_el else "Договорная"
-                        
-                        full_url = href if href.startswith('http') else f"{self.BASE_URL}{href}"
-                        
-                        orders.append({
-                            'external_id': order_id,
-                            'source': self.SOURCE_NAME,
-                            'title': title[:200],
-                            'description': '',
-                            'budget': budget,
-                            'budget_value': self._extract_price(budget),
-                            'url': full_url,
-                            'category': category
-                        })
-                        
-                    except Exception as e:
-                        continue
-                        
         except Exception as e:
             logger.error(f"Freelance.ru parse error: {e}")
         
         logger.info(f"Freelance.ru: found {len(orders)} orders for {category}")
         return orders
     
+    def _parse_page(self, html: str, category: str) -> List[Dict[str, Any]]:
+        orders = []
+        soup = self.parse_html(html)
+        
+        projects = soup.select('.project, .project-item, [class*="project"]')[:15]
+        
+        for project in projects:
+            try:
+                title_el = project.select_one('a.project-name, .title a, h2 a')
+                if not title_el:
+                    continue
+                
+                title = title_el.get_text(strip=True)
+                href = title_el.get('href', '')
+                
+                if not title or len(title) < 5:
+                    continue
+                
+                order_id = re.search(r'/(\d+)', href)
+                order_id = order_id.group(1) if order_id else href
+                
+                price_el = project.select_one('.price, .cost, [class*="price"]')
+                budget = price_el.get_text(strip=True) if price_el else "Договорная"
+                
+                full_url = href if href.startswith('http') else f"{self.BASE_URL}{href}"
+                
+                orders.append({
+                    'external_id': order_id,
+                    'source': self.SOURCE_NAME,
+                    'title': title[:200],
+                    'description': '',
+                    'budget': budget,
+                    'budget_value': self._extract_price(budget),
+                    'url': full_url,
+                    'category': category
+                })
+                
+            except Exception as e:
+                continue
+        
+        return orders
+    
     def _extract_price(self, text: str) -> int:
         if not text:
             return 0
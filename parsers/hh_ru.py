@@ -1,12 +1,29 @@
 # parsers/hh_ru.py
-import aiohttp
-from typing import List, Dict, Any
-from .base import BaseParser
+import asyncio
+import re
+import time
+from typing import List, Dict, Any, Optional, Set, Tuple
+from .base import BaseParser, defer_until_saved
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+# Положение запроса: (курсор, пропуск). Вакансии новее курсора ещё не сохранены,
+# кроме диапазона пропуска (самая старая забранная, самая новая забранная) — он сохранён
+_Position = Tuple[Optional[str], Optional[Tuple[str, str]]]
+
+
+class _Batch:
+    """Один общий ответ по ролям: курсор сдвигается, когда все его категории сохранены"""
+    
+    __slots__ = ("advance", "pending")
+    
+    def __init__(self, advance: Optional[Tuple[_Position, _Position]], pending: Set[str]):
+        self.advance = advance
+        self.pending = pending
+
+
 class HHParser(BaseParser):
     SOURCE_NAME = "hh"
     API_URL = "https://api.hh.ru/vacancies"
@@ -18,87 +35,200 @@ class HHParser(BaseParser):
         "marketing": {"text": "маркетолог", "professional_role": 70},
     }
     
+    PER_PAGE = 50
+    MAX_PAGES = 5  # Сколько страниц новых вакансий догоняем за один запрос
+    BATCH_TTL = 30  # Сколько секунд категории разбирают общий ответ без нового запроса
+    
+    def __init__(self):
+        super().__init__()
+        # Ключ запроса -> положение (_Position) в ленте вакансий
+        self._positions: Dict[str, _Position] = {}
+        # Категория -> (общий ответ, его вакансии этой категории), которые она ещё не забрала
+        self._batch: Dict[str, List[Tuple[_Batch, List[Dict[str, Any]]]]] = {}
+        self._batch_at = 0.0
+        self._batch_lock = asyncio.Lock()
+    
     async def parse_orders(self, category: str) -> List[Dict[str, Any]]:
         orders = []
         
         try:
-            config = self.CATEGORY_MAP.get(category, {"text": category})
-            
-            params = {
-                "text": config.get("text", category),
-                "area": 113,  # Россия
-                "per_page": 20,
-                "order_by": "publication_time",
-                "schedule": "remote",
-            }
-            
-            session = await self.get_session()
-            
-            async with session.get(
-                self.API_URL,
-                params=params,
-                headers={"User-Agent": "FreelanceRadar/1.0"},
-                timeout=aiohttp.ClientTimeout(total=15)
-            ) as response:
-                
-                if response.status != 200:
-                    logger.warning(f"HH.ru returned {response.status}")
-                    return orders
-                
-                data = await response.json()
-                
-                for item in data.get("items", [])[:15]:
-                    try:
-                        # Зарплата
-                        salary = item.get("salary")
-                        budget = "Не указана"
-                        budget_value = 0
-                        
-                        if salary:
-                            currency = salary.get("currency", "RUR")
-                            if salary.get("from") and salary.get("to"):
-                                budget = f"{salary['from']:,} - {salary['to']:,} {currency}".replace(',', ' ')
-                                budget_value = salary["from"]
-                            elif salary.get("from"):
-                                budget = f"от {salary['from']:,} {currency}".replace(',', ' ')
-                                budget_value = salary["from"]
-                            elif salary.get("to"):
-                                budget = f"до {salary['to']:,} {currency}".replace(',', ' ')
-                                budget_value = salary["to"]
-                        
-                        # Описание
-                        snippet = item.get("snippet", {})
-                        description = ""
-                        if snippet.get("requirement"):
-                            description = snippet["requirement"]
-                        if snippet.get("responsibility"):
-                            description += "\n" + snippet["responsibility"]
-                        
-                        # Убираем HTML теги
-                        import re
-                        description = re.sub(r'<[^>]+>', '', description)
-                        
-                        # Работодатель
-                        employer = item.get("employer", {}).get("name", "")
-                        if employer:
-                            description = f"🏢 {employer}\n\n{description}"
-                        
-                        orders.append({
-                            'external_id': str(item.get("id", "")),
-                            'source': self.SOURCE_NAME,
-                            'title': item.get("name", "Без названия"),
-                            'description': description[:2000],
-                            'budget': budget,
-                            'budget_value': budget_value,
-                            'url': item.get("alternate_url", ""),
-                            'category': category
-                        })
-                        
-                    except Exception as e:
-                        continue
-                        
+            if category in self.CATEGORY_MAP:
+                orders = await self._orders_from_batch(category)
+            else:
+                # Неизвестная категория — отдельный текстовый запрос
+                items, advance = await self._fetch_vacancies(category, [("text", category)])
+                orders = [self._parse_item(item, category) for item in items]
+                defer_until_saved(lambda: self._advance_cursor(category, advance))
+                orders = [order for order in orders if order]
         except Exception as e:
             logger.error(f"HH.ru parse error: {e}")
         
         logger.info(f"HH.ru: found {len(orders)} orders for {category}")
         return orders
+    
+    async def _orders_from_batch(self, category: str) -> List[Dict[str, Any]]:
+        """Вакансии категории из общего ответа по ролям"""
+        async with self._batch_lock:
+            fresh = time.monotonic() - self._batch_at < self.BATCH_TTL
+            if not (fresh and category in self._batch):
+                items, advance = await self._fetch_vacancies("roles", self._batch_params())
+                routed = {cat: cat_items for cat, cat_items in self._route(items).items() if cat_items}
+                batch = _Batch(advance, set(routed))
+                for cat, cat_items in routed.items():
+                    self._batch.setdefault(cat, []).append((batch, cat_items))
+                self._batch_at = time.monotonic()
+                # Пустой ответ: ждать некого
+                self._batch_saved(batch, None)
+            
+            parts = self._batch.pop(category, [])
+        
+        items = []
+        for batch, cat_items in parts:
+            items.extend(cat_items)
+            defer_until_saved(lambda batch=batch: self._batch_saved(batch, category))
+        
+        orders = [self._parse_item(item, category) for item in items]
+        return [order for order in orders if order]
+    
+    def _batch_saved(self, batch: _Batch, category: Optional[str]):
+        batch.pending.discard(category)
+        if not batch.pending:
+            self._advance_cursor("roles", batch.advance)
+    
+    def _advance_cursor(self, key: str, advance: Optional[Tuple[_Position, _Position]]):
+        # Сдвигаем, только если с начала опроса положение не менял другой опрос
+        if advance and self._positions.get(key, (None, None)) == advance[0]:
+            self._positions[key] = advance[1]
+    
+    def _batch_params(self) -> List[Tuple[str, Any]]:
+        params = [("text", " OR ".join(config["text"] for config in self.CATEGORY_MAP.values()))]
+        params += [("professional_role", config["professional_role"]) for config in self.CATEGORY_MAP.values()]
+        return params
+    
+    def _route(self, items: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+        """Раскладывает вакансии по нашим категориям по professional_roles"""
+        role_to_category = {
+            str(config["professional_role"]): category for category, config in self.CATEGORY_MAP.items()
+        }
+        routed: Dict[str, List[Dict[str, Any]]] = {category: [] for category in self.CATEGORY_MAP}
+        for item in items:
+            categories = {role_to_category.get(str(role.get("id"))) for role in item.get("professional_roles") or []}
+            for category in categories - {None}:
+                routed[category].append(item)
+        return routed
+    
+    async def _fetch_vacancies(
+        self, key: str, query: List[Tuple[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], Optional[Tuple[_Position, _Position]]]:
+        """Вакансии после курсора и сдвиг положения (было, стало) или None"""
+        position = self._positions.get(key, (None, None))
+        cursor, gap = position
+        base_params = query + [
+            ("area", 113),  # Россия
+            ("per_page", self.PER_PAGE),
+            ("order_by", "publication_time"),
+            ("schedule", "remote"),
+        ]
+        if cursor:
+            base_params.append(("date_from", cursor))
+        if gap:
+            base_params.append(("date_to", gap[0]))
+        
+        items: List[Dict[str, Any]] = []
+        page = 0
+        complete = True
+        truncated = False
+        while True:
+            data = await self._get_page(base_params + [("page", page)])
+            if data is None:
+                complete = False
+                break
+            items.extend(data.get("items", []))
+            page += 1
+            # Без курсора не догоняем историю — только первая страница
+            if not cursor or page >= data.get("pages", 0):
+                break
+            if page >= self.MAX_PAGES:
+                truncated = True
+                break
+        
+        # Положение сдвигаем, только если забрали все страницы, иначе следующий тик их повторит
+        if not complete:
+            return items, None
+        newest = gap[1] if gap else self._newest_published_at(items)
+        oldest = self._oldest_published_at(items)
+        if truncated and oldest:
+            # Не забранные страницы старше oldest — их заберут следующие опросы
+            return items, (position, (cursor, (oldest, newest)))
+        return items, (position, (newest or cursor, None))
+    
+    async def _get_page(self, params: List[Tuple[str, Any]]) -> Optional[Dict[str, Any]]:
+        status, data = await self.fetch_json(
+            self.API_URL,
+            params=params,
+            headers={"User-Agent": "FreelanceRadar/1.0"},
+        )
+        if status != 200:
+            logger.warning(f"HH.ru returned {status}")
+            return None
+        return data
+    
+    @staticmethod
+    def _newest_published_at(items: List[Dict[str, Any]]) -> Optional[str]:
+        # published_at приходит в одном часовом поясе (+0300), строки сравнимы
+        dates = [item["published_at"] for item in items if item.get("published_at")]
+        return max(dates) if dates else None
+    
+    @staticmethod
+    def _oldest_published_at(items: List[Dict[str, Any]]) -> Optional[str]:
+        dates = [item["published_at"] for item in items if item.get("published_at")]
+        return min(dates) if dates else None
+    
+    def _parse_item(self, item: Dict[str, Any], category: str) -> Optional[Dict[str, Any]]:
+        try:
+            # Зарплата
+            salary = item.get("salary")
+            budget = "Не указана"
+            budget_value = 0
+            
+            if salary:
+                currency = salary.get("currency", "RUR")
+                if salary.get("from") and salary.get("to"):
+                    budget = f"{salary['from']:,} - {salary['to']:,} {currency}".replace(',', ' ')
+                    budget_value = salary["from"]
+                elif salary.get("from"):
+                    budget = f"от {salary['from']:,} {currency}".replace(',', ' ')
+                    budget_value = salary["from"]
+                elif salary.get("to"):
+                    budget = f"до {salary['to']:,} {currency}".replace(',', ' ')
+                    budget_value = salary["to"]
+            
+            # Описание
+            snippet = item.get("snippet", {})
+            description = ""
+            if snippet.get("requirement"):
+                description = snippet["requirement"]
+            if snippet.get("responsibility"):
+                description += "\n" + snippet["responsibility"]
+            
+            # Убираем HTML теги
+            description = re.sub(r'<[^>]+>', '', description)
+            
+            # Работодатель
+            employer = item.get("employer", {}).get("name", "")
+            if employer:
+                description = f"🏢 {employer}\n\n{description}"
+            
+            return {
+                'external_id': str(item.get("id", "")),
+                'source': self.SOURCE_NAME,
+                'title': item.get("name", "Без названия"),
+                'description': description[:2000],
+                'budget': budget,
+                'budget_value': budget_value,
+                'url': item.get("alternate_url", ""),
+                'category': category
+            }
+        
+        except Exception as e:
+            return None
@@ -0,0 +1,96 @@
+# parsers/http_pool.py
+import logging
+from typing import Dict, Optional
+
+import aiohttp
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+}
+
+
+class HttpPool:
+    """Общий пул соединений для всех парсеров"""
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._counters = {
+            "requests": 0,
+            "request_errors": 0,
+            "connections_created": 0,
+            "connections_reused": 0,
+            "dns_cache_hits": 0,
+            "dns_cache_misses": 0,
+        }
+
+    def _count(self, key: str):
+        async def handler(session, ctx, params):
+            self._counters[key] += 1
+        return handler
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+        trace.on_request_end.append(self._count("requests"))
+        trace.on_request_exception.append(self._count("request_errors"))
+        trace.on_connection_create_end.append(self._count("connections_created"))
+        trace.on_connection_reuseconn.append(self._count("connections_reused"))
+        trace.on_dns_cache_hit.append(self._count("dns_cache_hits"))
+        trace.on_dns_cache_miss.append(self._count("dns_cache_misses"))
+        return trace
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=Config.HTTP_POOL_LIMIT,
+                limit_per_host=Config.HTTP_POOL_LIMIT_PER_HOST,
+                ttl_dns_cache=Config.HTTP_DNS_CACHE_TTL,
+                keepalive_timeout=Config.HTTP_KEEPALIVE_TIMEOUT,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=DEFAULT_HEADERS,
+                trace_configs=[self._trace_config()],
+            )
+            logger.info("HTTP pool session created")
+        return self._session
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+            logger.info("HTTP pool session closed")
+        self._session = None
+
+    def stats(self) -> Dict:
+        """Статистика пула для мониторинга"""
+        in_use: Dict[str, int] = {}
+        idle: Dict[str, int] = {}
+
+        connector = self._session.connector if self._session and not self._session.closed else None
+        if connector is not None:
+            # У TCPConnector нет публичного API для открытых соединений
+            for key, conns in getattr(connector, "_conns", {}).items():
+                idle[key.host] = idle.get(key.host, 0) + len(conns)
+            for key, conns in getattr(connector, "_acquired_per_host", {}).items():
+                in_use[key.host] = in_use.get(key.host, 0) + len(conns)
+
+        created = self._counters["connections_created"]
+        reused = self._counters["connections_reused"]
+
+        return {
+            "active": connector is not None,
+            "limit": Config.HTTP_POOL_LIMIT,
+            "limit_per_host": Config.HTTP_POOL_LIMIT_PER_HOST,
+            "dns_cache_ttl": Config.HTTP_DNS_CACHE_TTL,
+            "keepalive_timeout": Config.HTTP_KEEPALIVE_TIMEOUT,
+            "in_use": in_use,
+            "idle": idle,
+            "reuse_ratio": round(reused / (created + reused), 3) if created + reused else 0.0,
+            **self._counters,
+        }
+
+
+http_pool = HttpPool()
@@ -1,5 +1,4 @@
 # parsers/kwork.py
-import aiohttp
 import re
 import json
 from typing import List, Dict, Any
@@ -8,10 +7,14 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+WANTS_ARRAY = re.compile(r'"wants"\s*:\s*\[')
+WHITESPACE = re.compile(r'\s*')
+
 
 class KworkParser(BaseParser):
     SOURCE_NAME = "kwork"
     BASE_URL = "https://kwork.ru"
+    HTML_BACKEND = "selectolax"
     
     # Используем API Kwork (более надёжно)
     API_URL = "https://kwork.ru/api/want/getwants"
@@ -23,108 +26,140 @@ class KworkParser(BaseParser):
         "marketing": 33,
     }
     
+    STATE_MARKER = "window.__INITIAL_STATE__"
+    WANTS_LIMIT = 15
+    
+    _decoder = json.JSONDecoder()
+    
     async def parse_orders(self, category: str) -> List[Dict[str, Any]]:
         orders = []
         
         try:
             cat_id = self.CATEGORY_MAP.get(category, 41)
             
-            session = await self.get_session()
-            
             # Пробуем через главную страницу проектов
             url = f"{self.BASE_URL}/projects?c={cat_id}"
             
-            async with session.get(url, timeout=aiohttp.ClientTimeout(total=15)) as response:
-                if response.status != 200:
-                    logger.warning(f"Kwork returned {response.status}")
-                    return orders
-                
-                html = await response.text()
+            status, html = await self.fetch_page(url)
+            if status == self.NOT_MODIFIED:
+                logger.debug(f"Kwork: {category} not modified, skipping parse")
+                return orders
+            if status != 200:
+                logger.warning(f"Kwork returned {status}")
+                return orders
+            
+            orders = self._parse_page(html, category)
+            self.page_parsed(url)
+            
+        except Exception as e:
+            logger.error(f"Kwork parse error: {e}")
+        
+        logger.info(f"Kwork: found {len(orders)} orders for {category}")
+        return orders
+    
+    def _parse_page(self, html: str, category: str) -> List[Dict[str, Any]]:
+        orders = []
+        
+        # Kwork хранит данные в window.__INITIAL_STATE__, нам нужны только первые wants
+        wants = self._extract_wants(html, self.WANTS_LIMIT)
+        
+        for item in wants:
+            try:
+                order_id = str(item.get('id', ''))
+                title = item.get('name', '')
+                description = item.get('description', '')
                 
-                # Ищем JSON с данными в HTML
-                # Kwork хранит данные в window.__INITIAL_STATE__
-                match = re.search(r'window\.__INITIAL_STATE__\s*=\s*({.+?});', html, re.DOTALL)
+                price_from = item.get('priceFrom', 0)
+                price_to = item.get('priceTo', 0)
                 
-                if match:
-                    try:
-                        data = json.loads(match.group(1))
-                        wants = data.get('wantsStore', {}).get('wants', [])
-                        
-                        for item in wants[:15]:
-                            try:
-                                order_id = str(item.get('id', ''))
-                                title = item.get('name', '')
-                                description = item.get('description', '')
-                                
-                                price_from = item.get('priceFrom', 0)
-                                price_to = item.get('priceTo', 0)
-                                
-                                if price_from and price_to:
-                                    budget = f"{price_from:,} - {price_to:,} ₽".replace(',', ' ')
-                                elif price_from:
-                                    budget = f"от {price_from:,} ₽".replace(',', ' ')
-                                else:
-                                    budget = "Договорная"
-                                
-                                orders.append({
-                                    'external_id': order_id,
-                                    'source': self.SOURCE_NAME,
-                                    'title': title,
-                                    'description': description[:2000],
-                                    'budget': budget,
-                                    'budget_value': price_from or price_to or 0,
-                                    'url': f"{self.BASE_URL}/projects/{order_id}",
-                                    'category': category
-                                })
-                            except Exception as e:
-                                continue
-                    except json.JSONDecodeError:
-                        pass
+                if price_from and price_to:
+                    budget = f"{price_from:,} - {price_to:,} ₽".replace(',', ' ')
+                elif price_from:
+                    budget = f"от {price_from:,} ₽".replace(',', ' ')
+                else:
+                    budget = "Договорная"
                 
-                # Fallback: парсим HTML
-                if not orders:
-                    from bs4 import BeautifulSoup
-                    soup = BeautifulSoup(html, 'html.parser')
+                orders.append({
+                    'external_id': order_id,
+                    'source': self.SOURCE_NAME,
+                    'title': title,
+                    'description': description[:2000],
+                    'budget': budget,
+                    'budget_value': price_from or price_to or 0,
+                    'url': f"{self.BASE_URL}/projects/{order_id}",
+                    'category': category
+                })
+            except Exception as e:
+                continue
+        
+        # Fallback: парсим HTML
+        if not orders:
+            soup = self.parse_html(html)
+            
+            cards = soup.select('.want-card, .kwork-card, [class*="want"]')[:15]
+            
+            for card in cards:
+                try:
+                    link = card.select_one('a[href*="/projects/"]')
+                    if not link:
+                        continue
                     
-                    cards = soup.select('.want-card, .kwork-card, [class*="want"]')[:15]
+                    title = link.get_text(strip=True)
+                    href = link.get('href', '')
                     
-                    for card in cards:
-                        try:
-                            link = card.select_one('a[href*="/projects/"]')
-                            if not link:
-                                continue
-                            
-                            title = link.get_text(strip=True)
-                            href = link.get('href', '')
-                            
-                            if not title or len(title) < 10:
-                                continue
-                            
-                            order_id = re.search(r'/projects/(\d+)', href)
-                            order_id = order_id.group(1) if order_id else href
-                            
-                            price_el = card.select_one('[class*="price"], .price')
-                            budget = price_el.get_text(strip=True) if price_el else "Договорная"
-                            
-                            orders.append({
-                                'external_id': order_id,
-                                'source': self.SOURCE_NAME,
-                                'title': title[:200],
-                                'description': '',
-                                'budget': budget,
-                                'budget_value': self._extract_price(budget),
-                                'url': f"{self.BASE_URL}{href}" if href.startswith('/') else href,
-                                'category': category
-                            })
-                        except Exception as e:
-                            continue
-                            
-        except Exception as e:
-            logger.error(f"Kwork parse error: {e}")
+                    if not title or len(title) < 10:
+                        continue
+                    
+                    order_id = re.search(r'/projects/(\d+)', href)
+                    order_id = order_id.group(1) if order_id else href
+                    
+                    price_el = card.select_one('[class*="price"], .price')
+                    budget = price_el.get_text(strip=True) if price_el else "Договорная"
+                    
+                    orders.append({
+                        'external_id': order_id,
+                        'source': self.SOURCE_NAME,
+                        'title': title[:200],
+                        'description': '',
+                        'budget': budget,
+                        'budget_value': self._extract_price(budget),
+                        'url': f"{self.BASE_URL}{href}" if href.startswith('/') else href,
+                        'category': category
+                    })
+                except Exception as e:
+                    continue
         
-        logger.info(f"Kwork: found {len(orders)} orders for {category}")
         return orders
     
+    def _extract_wants(self, html: str, limit: int) -> List[Dict[str, Any]]:
+        """Первые limit элементов wantsStore.wants без разбора всего state"""
+        start = html.find(self.STATE_MARKER)
+        if start < 0:
+            return []
+        store = html.find('"wantsStore"', start)
+        if store < 0:
+            return []
+        match = WANTS_ARRAY.search(html, store)
+        if not match:
+            return []
+        
+        wants = []
+        pos = match.end()
+        try:
+            while len(wants) < limit:
+                pos = WHITESPACE.match(html, pos).end()
+                if html[pos] == ']':
+                    break
+                item, pos = self._decoder.raw_decode(html, pos)
+                if isinstance(item, dict):
+                    wants.append(item)
+                pos = WHITESPACE.match(html, pos).end()
+                if html[pos] == ',':
+                    pos += 1
+        except (json.JSONDecodeError, IndexError) as e:
+            logger.debug(f"Kwork: broken wants array at {pos}: {e}")
+        return wants
+    
     def _extract_price(self, text: str) -> int:
         if not text:
             return 0
@@ -6,6 +6,7 @@ from .price_calculator import price_calculator, PriceCalculator
 from .achievements import achievements, AchievementSystem
 from .market_analytics import market_analytics, MarketAnalytics
 from .smart_alerts import smart_alerts, SmartAlerts
+from .parse_engine import parse_engine, ParseEngine
 
 __all__ = [
     'gigachat_service', 'GigaChatService',
@@ -15,4 +16,5 @@ __all__ = [
     'achievements', 'AchievementSystem',
     'market_analytics', 'MarketAnalytics',
     'smart_alerts', 'SmartAlerts',
+    'parse_engine', 'ParseEngine',
 ]
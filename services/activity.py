@@ -0,0 +1,65 @@
+# services/activity.py
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityBuffer:
+    """Отложенная запись активности пользователей Mini App"""
+
+    def __init__(self):
+        self._pending: Dict[int, List[datetime]] = {}
+        self._task = None
+        self.touches = 0
+        self.flushed = 0
+
+    def touch(self, telegram_id: int):
+        now = datetime.utcnow()
+        moments = self._pending.get(telegram_id)
+        if moments is None:
+            self._pending[telegram_id] = [now]
+        else:
+            moments[1:] = [now]
+        self.touches += 1
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._flusher())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        from database.db import Database
+        try:
+            await Database.update_users_activity(pending)
+            self.flushed += len(pending)
+        except Exception as e:
+            logger.error(f"Failed to save activity of {len(pending)} users: {e}")
+
+    async def _flusher(self):
+        while True:
+            await asyncio.sleep(Config.ACTIVITY_FLUSH_INTERVAL)
+            await self.flush()
+
+    def stats(self) -> Dict:
+        return {
+            "pending": len(self._pending),
+            "touches": self.touches,
+            "flushed": self.flushed,
+        }
+
+
+activity_buffer = ActivityBuffer()
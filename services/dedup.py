@@ -0,0 +1,176 @@
+# services/dedup.py
+import asyncio
+import hashlib
+import logging
+import re
+from array import array
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+WORD = re.compile(r"\w+")
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# Один blake2b на 64 байта даёт 16 32-битных хешей, 4 соли — 64 «перестановки»
+SALTS = [bytes([i]) * 16 for i in range(NUM_PERM // 16)]
+
+
+def _words(text: str) -> List[str]:
+    return [word for word in WORD.findall(text.lower().replace("ё", "е")) if len(word) > 1]
+
+
+def _shingles(words: List[str], size: int) -> Set[str]:
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def shingles(title: str, description: str, size: int = 3) -> Set[str]:
+    """Словесные шинглы заголовка и начала описания"""
+    title_words = _words(title or "")
+    words = title_words + _words((description or "")[:1000])
+    return _shingles(words, size) | {f"title:{word}" for word in title_words}
+
+
+def minhash(title: str, description: str) -> Optional[bytes]:
+    """MinHash-подпись текста заказа или None"""
+    features = shingles(title, description)
+    if not features:
+        return None
+    rows = []
+    for feature in features:
+        data = feature.encode()
+        row = array("I")
+        for salt in SALTS:
+            row.frombytes(hashlib.blake2b(data, digest_size=64, salt=salt).digest())
+        rows.append(row)
+    return bytes(value & 0xFF for value in map(min, zip(*rows)))
+
+
+def similarity(a: bytes, b: bytes) -> float:
+    """Оценка коэффициента Жаккара по двум подписям"""
+    matches = sum(x == y for x, y in zip(a, b)) / NUM_PERM
+    # Поправка на случайные совпадения младших байтов (1/256)
+    return max(0.0, (matches - 1 / 256) / (1 - 1 / 256))
+
+
+class DedupIndex:
+    """Кластеры почти одинаковых заказов с разных бирж"""
+
+    def __init__(self, window: int = None, threshold: float = None):
+        self.window = window or Config.DEDUP_WINDOW
+        self.threshold = threshold or Config.DEDUP_THRESHOLD
+        self._buckets: List[Dict[bytes, List[Tuple[bytes, int]]]] = [{} for _ in range(BANDS)]
+        self._entries = deque()
+        # cluster_id -> user.id, которым кластер уже поставлен в очередь
+        self._notified: "OrderedDict[int, Set[int]]" = OrderedDict()
+        self._next_cluster_id = None
+        self._warmed = False
+        self._lock = asyncio.Lock()
+        self.duplicates = 0
+
+    @staticmethod
+    def _band_keys(fingerprint: bytes) -> Iterable[Tuple[int, bytes]]:
+        for band in range(BANDS):
+            yield band, fingerprint[band * ROWS:(band + 1) * ROWS]
+
+    def find(self, fingerprint: bytes) -> Optional[int]:
+        """cluster_id самого похожего известного заказа или None"""
+        best = None
+        checked = set()
+        for band, key in self._band_keys(fingerprint):
+            for other, cluster_id in self._buckets[band].get(key, ()):
+                if other in checked:
+                    continue
+                checked.add(other)
+                score = similarity(fingerprint, other)
+                if score >= self.threshold and (best is None or score > best[0]):
+                    best = (score, cluster_id)
+        return best[1] if best else None
+
+    def _add(self, fingerprint: bytes, cluster_id: int):
+        entry = (fingerprint, cluster_id)
+        for band, key in self._band_keys(fingerprint):
+            self._buckets[band].setdefault(key, []).append(entry)
+        self._entries.append(entry)
+
+        while len(self._entries) > self.window:
+            old = self._entries.popleft()
+            for band, key in self._band_keys(old[0]):
+                bucket = self._buckets[band].get(key)
+                if bucket:
+                    bucket.remove(old)
+                    if not bucket:
+                        del self._buckets[band][key]
+
+    def _new_cluster_id(self) -> int:
+        cluster_id = self._next_cluster_id
+        self._next_cluster_id += 1
+        return cluster_id
+
+    def assign(self, orders: List[Dict]):
+        """Проставляет заказам fingerprint и cluster_id перед записью"""
+        for order in orders:
+            fingerprint = minhash(order.get('title'), order.get('description'))
+            if fingerprint is None:
+                continue
+            order['fingerprint'] = fingerprint
+            if not self._warmed:
+                continue
+            cluster_id = self.find(fingerprint)
+            if cluster_id is None:
+                cluster_id = self._new_cluster_id()
+            else:
+                self.duplicates += 1
+            order['cluster_id'] = cluster_id
+            self._add(fingerprint, cluster_id)
+
+    def claim_recipients(self, cluster_id: Optional[int], user_ids: Iterable[int]) -> Set[int]:
+        """Получатели, которым кластер ещё не ставился в очередь"""
+        user_ids = set(user_ids)
+        if cluster_id is None:
+            return user_ids
+        notified = self._notified.get(cluster_id)
+        if notified is None:
+            notified = self._notified[cluster_id] = set()
+            if len(self._notified) > self.window:
+                self._notified.popitem(last=False)
+        fresh = user_ids - notified
+        notified |= fresh
+        return fresh
+
+    async def warm_up(self):
+        """Один раз за процесс загружает отпечатки последних заказов из БД"""
+        if self._warmed:
+            return
+        async with self._lock:
+            if self._warmed:
+                return
+            from database.db import Database
+            try:
+                rows = await Database.get_recent_fingerprints(self.window)
+                self._next_cluster_id = await Database.get_max_cluster_id() + 1
+            except Exception as e:
+                logger.error(f"Dedup index warm up failed: {e}")
+                return
+            for fingerprint, cluster_id in reversed(rows):
+                self._add(fingerprint, cluster_id if cluster_id is not None else self._new_cluster_id())
+            self._warmed = True
+            logger.info(f"Dedup index warmed with {len(rows)} orders")
+
+    def stats(self) -> Dict:
+        return {
+            "window": self.window,
+            "threshold": self.threshold,
+            "orders": len(self._entries),
+            "duplicates": self.duplicates,
+            "largest_bucket": max((len(b) for buckets in self._buckets for b in buckets.values()), default=0),
+        }
+
+
+dedup_index = DedupIndex()
@@ -0,0 +1,230 @@
+# services/delivery.py
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Полосы очереди по urgency из SmartAlerts.analyze_order, от самой срочной
+LANES = ("critical", "high", "medium", "low")
+
+
+class Notification(NamedTuple):
+    """Готовое к отправке уведомление"""
+    chat_id: int
+    text: str
+    reply_markup: Any = None
+    user_id: Optional[int] = None
+    order_id: Optional[int] = None
+    lane: str = "low"
+    parsed_at: float = 0.0  # time.monotonic() момента, когда заказ пришёл с биржи
+    enqueued_at: float = 0.0
+
+
+class TokenBucket:
+    """Token bucket: не больше rate отправок в секунду, всплеск до capacity"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class DeliveryQueue:
+    """Приоритетная очередь уведомлений в Telegram с пулом воркеров"""
+
+    def __init__(self):
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue(maxsize=Config.DELIVERY_QUEUE_SIZE)
+        self._seq = itertools.count()
+        self._bucket = TokenBucket(Config.DELIVERY_RATE)
+        self._chat_next_at: Dict[int, float] = {}
+        self._paused_until = 0.0
+        self._delivered: List[Tuple[int, int]] = []
+        self._tasks: List[asyncio.Task] = []
+        self._bot: Optional[Bot] = None
+        self._wait_times = deque(maxlen=1000)
+        self._send_times = deque(maxlen=1000)
+        self._lane_depth = dict.fromkeys(LANES, 0)
+        self._lane_sent = dict.fromkeys(LANES, 0)
+        self._lane_latency = {lane: deque(maxlen=1000) for lane in LANES}
+        self._counters = {
+            "enqueued": 0,
+            "sent": 0,
+            "failed": 0,
+            "retried": 0,
+            "dropped": 0,
+            "blocked": 0,
+        }
+
+    def start(self, bot: Bot):
+        """Запускает воркеры и периодическую запись доставленных"""
+        if self._tasks:
+            return
+        self._bot = bot
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(Config.DELIVERY_WORKERS)]
+        self._tasks.append(asyncio.create_task(self._flusher()))
+        logger.info(f"Delivery queue started with {Config.DELIVERY_WORKERS} workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.flush()
+
+    def enqueue(self, notification: Notification) -> bool:
+        """Кладёт уведомление в очередь, никогда не ждёт. False — очередь переполнена"""
+        lane = notification.lane if notification.lane in LANES else LANES[-1]
+        notification = notification._replace(lane=lane, enqueued_at=time.monotonic())
+        try:
+            self._queue.put_nowait((LANES.index(lane), next(self._seq), notification))
+        except asyncio.QueueFull:
+            self._counters["dropped"] += 1
+            logger.warning(f"Delivery queue is full, dropped notification to {notification.chat_id}")
+            return False
+        self._counters["enqueued"] += 1
+        self._lane_depth[lane] += 1
+        return True
+
+    async def _wait_for_slot(self, chat_id: int):
+        # Пауза после 429, затем интервал для чата и общий лимит
+        now = time.monotonic()
+        if self._paused_until > now:
+            await asyncio.sleep(self._paused_until - now)
+
+        now = time.monotonic()
+        next_at = max(now, self._chat_next_at.get(chat_id, 0.0))
+        self._chat_next_at[chat_id] = next_at + Config.DELIVERY_PER_CHAT_INTERVAL
+        if next_at > now:
+            await asyncio.sleep(next_at - now)
+
+        await self._bucket.acquire()
+
+    async def _send(self, notification: Notification) -> bool:
+        for attempt in range(Config.DELIVERY_MAX_RETRIES + 1):
+            await self._wait_for_slot(notification.chat_id)
+            started = time.monotonic()
+            try:
+                await self._bot.send_message(
+                    notification.chat_id,
+                    notification.text,
+                    parse_mode="HTML",
+                    reply_markup=notification.reply_markup,
+                    disable_web_page_preview=True
+                )
+                self._send_times.append(time.monotonic() - started)
+                return True
+            except TelegramRetryAfter as e:
+                # Flood control: ждём, сколько сказал Telegram, и пробуем снова
+                self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after)
+                self._counters["retried"] += 1
+                logger.warning(f"Telegram flood control, retry after {e.retry_after}s (attempt {attempt + 1})")
+            except TelegramForbiddenError:
+                # Пользователь заблокировал бота — повторять бессмысленно
+                self._counters["blocked"] += 1
+                return False
+            except Exception as e:
+                logger.error(f"Error sending notification to {notification.chat_id}: {e}")
+                return False
+        return False
+
+    async def _worker(self):
+        while True:
+            _, _, notification = await self._queue.get()
+            self._lane_depth[notification.lane] -= 1
+            try:
+                self._wait_times.append(time.monotonic() - notification.enqueued_at)
+                if await self._send(notification):
+                    self._counters["sent"] += 1
+                    self._lane_sent[notification.lane] += 1
+                    if notification.parsed_at:
+                        self._lane_latency[notification.lane].append(time.monotonic() - notification.parsed_at)
+                    if notification.user_id is not None and notification.order_id is not None:
+                        self._delivered.append((notification.user_id, notification.order_id))
+                        if len(self._delivered) >= Config.DELIVERY_FLUSH_SIZE:
+                            await self.flush()
+                else:
+                    self._counters["failed"] += 1
+            except Exception as e:
+                self._counters["failed"] += 1
+                logger.error(f"Delivery worker error: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def flush(self):
+        """Записывает доставленные пары в sent_orders одним запросом"""
+        if not self._delivered:
+            return
+        pairs, self._delivered = self._delivered, []
+        from database.db import Database
+        try:
+            await Database.mark_orders_sent_bulk(pairs)
+        except Exception as e:
+            logger.error(f"Failed to mark {len(pairs)} notifications as sent: {e}")
+
+    async def _flusher(self):
+        while True:
+            await asyncio.sleep(Config.DELIVERY_FLUSH_INTERVAL)
+            await self.flush()
+            # Забываем чаты, интервал которых уже истёк
+            now = time.monotonic()
+            self._chat_next_at = {
+                chat_id: next_at for chat_id, next_at in self._chat_next_at.items() if next_at > now
+            }
+
+    @staticmethod
+    def _percentiles(samples) -> Dict:
+        if not samples:
+            return {"p50_ms": None, "p95_ms": None, "max_ms": None}
+        ordered = sorted(samples)
+        return {
+            "p50_ms": round(ordered[len(ordered) // 2] * 1000, 1),
+            "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+            "max_ms": round(ordered[-1] * 1000, 1),
+        }
+
+    def stats(self) -> Dict:
+        return {
+            "running": bool(self._tasks),
+            "workers": Config.DELIVERY_WORKERS,
+            "rate": Config.DELIVERY_RATE,
+            "queue_depth": self._queue.qsize(),
+            "pending_marks": len(self._delivered),
+            "paused_for": max(0.0, round(self._paused_until - time.monotonic(), 1)),
+            "queue_wait": self._percentiles(self._wait_times),
+            "send_latency": self._percentiles(self._send_times),
+            "lanes": {
+                lane: {
+                    "queued": self._lane_depth[lane],
+                    "sent": self._lane_sent[lane],
+                    "parse_to_delivery": self._percentiles(self._lane_latency[lane]),
+                }
+                for lane in LANES
+            },
+            **self._counters,
+        }
+
+
+delivery_queue = DeliveryQueue()
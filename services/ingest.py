@@ -0,0 +1,202 @@
+# services/ingest.py
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from config import Config
+from database.db import Database
+from database.models import Order
+from services.dedup import dedup_index
+from services.price_calculator import PriceCalculator, price_calculator
+from services.pubsub import order_broadcaster
+from services.ranking import ranking_fields
+from services.scam_detector import ScamDetector, scam_detector
+
+logger = logging.getLogger(__name__)
+
+# Увеличить, если меняется логика анализа, а не таблицы правил
+ANALYSIS_REVISION = 2
+
+
+def rules_version() -> str:
+    """Хеш правил скам-детектора и калькулятора сложности"""
+    rules = (
+        ANALYSIS_REVISION,
+        ScamDetector.RED_FLAGS,
+        ScamDetector.GREEN_FLAGS,
+        ScamDetector.URGENCY_PATTERNS,
+        ScamDetector.SUSPICIOUS_BUDGETS,
+        PriceCalculator.COMPLEXITY_PATTERNS,
+    )
+    return hashlib.sha1(repr(rules).encode()).hexdigest()[:16]
+
+
+ANALYSIS_VERSION = rules_version()
+
+# Поля заказа, от которых зависит анализ (только они уходят в пул)
+ANALYZED_FIELDS = ('title', 'description', 'budget', 'budget_value', 'category')
+
+
+def _get(order, name: str) -> Any:
+    """Поле заказа: словаря из парсера или строки Order"""
+    return order.get(name) if isinstance(order, dict) else getattr(order, name, None)
+
+
+def analyze_fields(order: Dict) -> Dict:
+    """Колонки анализа одного заказа"""
+    title = order.get('title') or ''
+    description = order.get('description') or ''
+    budget_value = order.get('budget_value') or 0
+
+    scam = scam_detector.analyze(title, description, order.get('budget') or '', budget_value)
+    price = price_calculator.calculate(title, description, order.get('category') or 'python', budget_value)
+
+    return {
+        'scam_score': scam['risk_score'],
+        'scam_warnings': scam['warnings'],
+        'scam_green_signs': scam['green_signs'],
+        'complexity': price['complexity'],
+        'complexity_multiplier': price['multiplier'],
+        'analysis_version': ANALYSIS_VERSION,
+    }
+
+
+def analyze_many(orders: List[Dict]) -> List[Dict]:
+    """Анализ пачки заказов (словари с ANALYZED_FIELDS). Выполняется в воркерах пула"""
+    return [analyze_fields(order) for order in orders]
+
+
+class IngestPipeline:
+    """Кросс-посты, анализ и запись спарсенных заказов"""
+
+    def __init__(self):
+        self._executor: Optional[Executor] = None
+        self.analyzed = 0
+        self.rescored = 0
+        self.last_rescore_batch = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if Config.ANALYSIS_EXECUTOR == "process":
+                # spawn: форк процесса с работающим loop и потоками aiohttp небезопасен
+                self._executor = ProcessPoolExecutor(
+                    max_workers=Config.ANALYSIS_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=Config.ANALYSIS_WORKERS,
+                    thread_name_prefix="analysis",
+                )
+        return self._executor
+
+    async def analyze_many(self, orders: List) -> List[Dict]:
+        """Колонки анализа для пачки заказов (словарей из парсера или строк Order)"""
+        if not orders:
+            return []
+        batch = [{field: _get(order, field) for field in ANALYZED_FIELDS} for order in orders]
+        self.analyzed += len(batch)
+
+        if Config.ANALYSIS_WORKERS <= 0:
+            return analyze_many(batch)
+
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        chunks = await asyncio.gather(*(
+            loop.run_in_executor(executor, analyze_many, batch[i:i + Config.ANALYSIS_CHUNK])
+            for i in range(0, len(batch), Config.ANALYSIS_CHUNK)
+        ))
+        return [analysis for chunk in chunks for analysis in chunk]
+
+    async def analyze(self, order) -> Dict:
+        """Колонки анализа для одного заказа"""
+        return (await self.analyze_many([order]))[0]
+
+    async def ingest(self, orders: List[Dict]) -> List[Order]:
+        """Размечает пачку заказов и сохраняет её. Возвращает только новые заказы"""
+        # Кросс-посты с других бирж получают тот же cluster_id
+        await dedup_index.warm_up()
+        dedup_index.assign(orders)
+
+        now = datetime.utcnow()
+        for order, analysis in zip(orders, await self.analyze_many(orders)):
+            order.update(analysis)
+            # Оценка без учёта времени и ключ сортировки — один раз при записи
+            order.update(ranking_fields(order, now))
+
+        # Сохраняем пачку одним запросом
+        new_orders = await Database.save_orders_bulk(orders)
+
+        # Открытые ленты Mini App получают новые заказы сразу
+        order_broadcaster.publish(new_orders)
+        return new_orders
+
+    def stored_scam_result(self, order) -> Optional[Dict]:
+        """Сохранённый в заказе скам-анализ или None, если он посчитан другими правилами"""
+        if _get(order, 'analysis_version') != ANALYSIS_VERSION:
+            return None
+        return scam_detector.build_result(
+            _get(order, 'scam_score') or 0,
+            _get(order, 'scam_warnings') or [],
+            _get(order, 'scam_green_signs') or [],
+        )
+
+    def scam_result(self, order) -> Dict:
+        """Скам-анализ заказа: сохранённый, а если его нет или правила поменялись — посчитанный заново"""
+        result = self.stored_scam_result(order)
+        if result is None:
+            result = scam_detector.analyze(
+                _get(order, 'title') or '',
+                _get(order, 'description') or '',
+                _get(order, 'budget') or '',
+                _get(order, 'budget_value') or 0,
+            )
+        return result
+
+    def price_result(self, order) -> Dict:
+        """Калькулятор цены заказа: сложность из сохранённого анализа, если он посчитан текущими правилами"""
+        complexity = None
+        if _get(order, 'analysis_version') == ANALYSIS_VERSION and _get(order, 'complexity_multiplier') is not None:
+            complexity = (_get(order, 'complexity_multiplier'), _get(order, 'complexity'))
+        return price_calculator.calculate(
+            _get(order, 'title') or '',
+            _get(order, 'description') or '',
+            _get(order, 'category') or 'python',
+            _get(order, 'budget_value') or 0,
+            complexity,
+        )
+
+    async def rescore(self) -> int:
+        """Пересчитывает пачку заказов со старой версией анализа. Возвращает их число"""
+        orders = await Database.get_orders_to_rescore(ANALYSIS_VERSION, Config.RESCORE_BATCH)
+        analyses = await self.analyze_many(orders)
+        rows = [{'id': order.id, **analysis} for order, analysis in zip(orders, analyses)]
+        await Database.update_orders_analysis(rows)
+
+        self.rescored += len(rows)
+        self.last_rescore_batch = len(rows)
+        if rows:
+            logger.info(f"Rescored {len(rows)} orders with analysis {ANALYSIS_VERSION}")
+        return len(rows)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict:
+        return {
+            "version": ANALYSIS_VERSION,
+            "executor": Config.ANALYSIS_EXECUTOR if Config.ANALYSIS_WORKERS > 0 else "inline",
+            "workers": Config.ANALYSIS_WORKERS,
+            "analyzed": self.analyzed,
+            "rescored": self.rescored,
+            "last_rescore_batch": self.last_rescore_batch,
+        }
+
+
+ingest_pipeline = IngestPipeline()
@@ -0,0 +1,92 @@
+# services/parse_engine.py
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Tuple
+
+from config import Config
+from parsers.base import deferred_commits
+from parsers.circuit_breaker import circuit_breakers, HALF_OPEN
+from services.seen_ids import seen_ids
+
+logger = logging.getLogger(__name__)
+
+
+class ParseEngine:
+    """Параллельный обход бирж с лимитами"""
+
+    def __init__(self, concurrency: int = None, per_source: int = None):
+        self.concurrency = concurrency or Config.PARSE_CONCURRENCY
+        self.per_source = per_source or Config.PARSE_PER_SOURCE_CONCURRENCY
+        self._global_limit = asyncio.Semaphore(self.concurrency)
+        self._source_limits: Dict[str, asyncio.Semaphore] = {}
+
+    @staticmethod
+    def jobs(parsers: Iterable, categories: Iterable[str]) -> List[Tuple[Any, str]]:
+        """Все пары (парсер, категория)"""
+        categories = list(categories)
+        return [(parser, category) for parser in parsers for category in categories]
+
+    def _source_limit(self, source: str) -> asyncio.Semaphore:
+        if source not in self._source_limits:
+            self._source_limits[source] = asyncio.Semaphore(self.per_source)
+        return self._source_limits[source]
+
+    async def _fetch(self, parser, category: str) -> Tuple[Any, str, List[Dict], List[Callable[[], None]]]:
+        breaker = circuit_breakers.get(parser.SOURCE_NAME)
+        
+        # Сначала слот биржи, потом общий — чтобы не держать общий слот в очереди к одной бирже
+        async with self._source_limit(parser.SOURCE_NAME):
+            # Недоступная биржа не тратит ни слотов, ни таймаутов, пока цепь разомкнута
+            probe = breaker.state == HALF_OPEN
+            if not breaker.allow_request():
+                logger.debug(f"{parser.SOURCE_NAME}/{category}: circuit {breaker.state}, skipped")
+                return parser, category, [], []
+            
+            async with self._global_limit:
+                started = time.monotonic()
+                commits: List[Callable[[], None]] = []
+                token = deferred_commits.set(commits)
+                try:
+                    orders = await parser.parse_orders(category)
+                except Exception as e:
+                    logger.error(f"Parse error {parser.SOURCE_NAME}/{category}: {e}")
+                    orders = []
+                finally:
+                    deferred_commits.reset(token)
+                    if probe:
+                        breaker.release_probe()
+                logger.debug(
+                    f"{parser.SOURCE_NAME}/{category}: {len(orders)} orders "
+                    f"in {time.monotonic() - started:.2f}s"
+                )
+
+        # Уже виденные заказы не доходят до БД
+        if orders:
+            await seen_ids.warm_up(parser.SOURCE_NAME)
+            orders = seen_ids.filter_new(parser.SOURCE_NAME, orders)
+
+        return parser, category, orders, commits
+
+    @staticmethod
+    def commit(commits: Iterable[Callable[[], None]]):
+        """Заказы опроса сохранены: выполняет его отложенные действия"""
+        for action in commits:
+            action()
+
+    async def stream(
+        self, jobs: Iterable[Tuple[Any, str]]
+    ) -> AsyncIterator[Tuple[Any, str, List[Dict], List[Callable[[], None]]]]:
+        """Запускает все задачи сразу и отдаёт (парсер, категория, заказы, отложенные действия) по мере готовности"""
+        tasks = [asyncio.create_task(self._fetch(parser, category)) for parser, category in jobs]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Потребитель мог прерваться — не оставляем висящих запросов
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+
+parse_engine = ParseEngine()
@@ -0,0 +1,84 @@
+# services/polling.py
+import logging
+import random
+import time
+from typing import Any, Dict, Iterable, List, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class PollState:
+    """Оценка потока заказов одной пары (биржа, категория)"""
+
+    __slots__ = ("rate", "interval", "next_at", "polled_at", "polls", "new_orders")
+
+    def __init__(self, rate: float):
+        self.rate = rate  # EWMA новых заказов в секунду
+        self.interval = Config.PARSE_INTERVAL
+        self.next_at = 0.0  # Первый опрос — сразу
+        self.polled_at = None
+        self.polls = 0
+        self.new_orders = 0
+
+
+class PollPlanner:
+    """Адаптивное расписание опроса бирж"""
+
+    def __init__(self):
+        self._states: Dict[Tuple[str, str], PollState] = {}
+
+    def _state(self, source: str, category: str) -> PollState:
+        key = (source, category)
+        if key not in self._states:
+            # Стартуем с прежнего фиксированного интервала
+            self._states[key] = PollState(Config.POLL_TARGET_NEW / Config.PARSE_INTERVAL)
+        return self._states[key]
+
+    def due(self, jobs: Iterable[Tuple[Any, str]]) -> List[Tuple[Any, str]]:
+        """Пары, которым пора опрашиваться. Они помечаются занятыми до record()"""
+        now = time.monotonic()
+        due = []
+        for parser, category in jobs:
+            state = self._state(parser.SOURCE_NAME, category)
+            if state.next_at <= now:
+                # Занята до record(); если результат потеряется — повторим через максимальный интервал
+                state.next_at = now + Config.POLL_MAX_INTERVAL
+                due.append((parser, category))
+        return due
+
+    def record(self, source: str, category: str, new_count: int):
+        """Учитывает результат опроса и назначает следующий"""
+        state = self._state(source, category)
+        now = time.monotonic()
+
+        elapsed = now - state.polled_at if state.polled_at is not None else state.interval
+        observed = new_count / max(elapsed, 1.0)
+        state.rate = Config.POLL_EWMA_ALPHA * observed + (1 - Config.POLL_EWMA_ALPHA) * state.rate
+
+        interval = Config.POLL_TARGET_NEW / state.rate if state.rate > 0 else Config.POLL_MAX_INTERVAL
+        interval = min(max(interval, Config.POLL_MIN_INTERVAL), Config.POLL_MAX_INTERVAL)
+        jitter = random.uniform(-Config.POLL_JITTER, Config.POLL_JITTER)
+
+        state.interval = interval
+        state.next_at = now + interval * (1 + jitter)
+        state.polled_at = now
+        state.polls += 1
+        state.new_orders += new_count
+
+    def stats(self) -> Dict:
+        now = time.monotonic()
+        return {
+            f"{source}/{category}": {
+                "rate_per_hour": round(state.rate * 3600, 2),
+                "interval": round(state.interval, 1),
+                "next_in": round(max(0.0, state.next_at - now), 1),
+                "polls": state.polls,
+                "new_orders": state.new_orders,
+            }
+            for (source, category), state in self._states.items()
+        }
+
+
+poll_planner = PollPlanner()
@@ -52,17 +52,18 @@ class PriceCalculator:
         ],
     }
     
-    async def calculate(self, title: str, description: str, category: str, 
-                       client_budget: int = 0) -> Dict:
-        """Рассчитывает рекомендуемую цену"""
-        text = f"{title} {description}".lower()
+    def calculate(self, title: str, description: str, category: str, 
+                  client_budget: int = 0, complexity: tuple = None) -> Dict:
+        """Рассчитывает рекомендуемую цену. complexity — (множитель, сложность) из сохранённого анализа"""
         
         # Получаем базовые ставки
         rates = self.MARKET_RATES.get(category, self.MARKET_RATES["python"])
         base_rates = rates.get("project", rates.get("hourly", {"min": 1000, "avg": 3000, "max": 10000}))
         
         # Определяем сложность и множитель
-        multiplier, complexity = self._detect_complexity(text)
+        if complexity is None:
+            complexity = self._detect_complexity(f"{title} {description}".lower())
+        multiplier, complexity = complexity
         
         # Рассчитываем цены
         recommended_min = int(base_rates["min"] * multiplier)
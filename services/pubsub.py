@@ -0,0 +1,104 @@
+# services/pubsub.py
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional, Set
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class OrderEvent:
+    """Новый заказ для подписчиков. Текст события собирается один раз на всех"""
+
+    __slots__ = ("order", "_data")
+
+    def __init__(self, order):
+        self.order = order
+        self._data = None
+
+    def data(self, render: Callable) -> str:
+        if self._data is None:
+            self._data = render(self.order)
+        return self._data
+
+
+class Subscription:
+    """Подписка одного соединения: фильтр и ограниченный буфер событий"""
+
+    __slots__ = ("category", "min_budget", "queue", "dropped")
+
+    def __init__(self, category: Optional[str], min_budget: int):
+        self.category = category
+        self.min_budget = min_budget
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=Config.STREAM_BUFFER)
+        self.dropped = 0
+
+    def matches(self, order) -> bool:
+        return (order.budget_value or 0) >= self.min_budget
+
+    def put(self, event: OrderEvent) -> bool:
+        """Кладёт событие, не ожидая. Если клиент не успевает читать, вытесняет самое старое"""
+        dropped = False
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+            dropped = True
+        self.queue.put_nowait(event)
+        return dropped
+
+    async def next_events(self, timeout: float) -> List[OrderEvent]:
+        """Всё, что накопилось; если пусто — ждёт первое событие не дольше timeout"""
+        events = []
+        if self.queue.empty():
+            try:
+                events.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                return events
+        while not self.queue.empty():
+            events.append(self.queue.get_nowait())
+        return events
+
+
+class OrderBroadcaster:
+    """Рассылка новых заказов открытым соединениям Mini App"""
+
+    def __init__(self):
+        # Категория (None — все категории) -> подписки
+        self._subscriptions: Dict[Optional[str], Set[Subscription]] = {}
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def subscribe(self, category: str = None, min_budget: int = 0) -> Subscription:
+        subscription = Subscription(category, min_budget)
+        self._subscriptions.setdefault(category, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscriptions = self._subscriptions.get(subscription.category)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.category]
+
+    def publish(self, orders: List):
+        for order in orders:
+            event = OrderEvent(order)
+            self.published += 1
+            for category in {order.category, None}:
+                for subscription in self._subscriptions.get(category, ()):
+                    if subscription.matches(order):
+                        self.dropped += subscription.put(event)
+                        self.delivered += 1
+
+    def stats(self) -> Dict:
+        return {
+            "subscribers": sum(len(subscriptions) for subscriptions in self._subscriptions.values()),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+order_broadcaster = OrderBroadcaster()
@@ -0,0 +1,89 @@
+# services/ranking.py
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import case, func
+
+from database.models import Order
+
+# Оценка заказа (ai_score в Mini App): база + бонус за бюджет + свежесть + совпадение с настройками
+BASE_SCORE = 50
+BUDGET_BONUS = ((50000, 35), (20000, 20))  # (от бюджета, бонус), по убыванию
+FRESH_SECONDS = 1800
+FRESH_BONUS = 15
+CATEGORY_BONUS = 20
+MIN_BUDGET_BONUS = 10
+MAX_SCORE = 99
+HOT_BUDGET = 30000
+
+# Сколько очков в час заказ теряет в сортировке по оценке.
+# Входит в сохранённый rank_key: после изменения rank_key нужно пересчитать
+RANK_POINTS_PER_HOUR = 5
+
+
+def base_score(budget_value: Optional[int]) -> int:
+    """Часть оценки, которая не зависит от времени и пользователя"""
+    budget_value = budget_value or 0
+    for min_budget, bonus in BUDGET_BONUS:
+        if budget_value >= min_budget:
+            return BASE_SCORE + bonus
+    return BASE_SCORE
+
+
+def rank_key(score: int, created_at: datetime) -> float:
+    """Ключ сортировки по оценке с затуханием, не зависящий от текущего времени"""
+    epoch = created_at.replace(tzinfo=timezone.utc).timestamp()
+    return score + epoch / 3600 * RANK_POINTS_PER_HOUR
+
+
+def ranking_fields(order: Dict, now: datetime) -> Dict:
+    """Колонки ранжирования нового заказа (created_at — время записи, как и по умолчанию)"""
+    score = base_score(order.get('budget_value'))
+    return {'base_score': score, 'rank_key': rank_key(score, now), 'created_at': now}
+
+
+def display_score(order, now: datetime) -> int:
+    """ai_score одного заказа без персонализации (события живой ленты)"""
+    score = order.base_score if order.base_score is not None else base_score(order.budget_value)
+    created = order.created_at.replace(tzinfo=timezone.utc) if order.created_at.tzinfo is None else order.created_at
+    if (now - created).total_seconds() < FRESH_SECONDS:
+        score += FRESH_BONUS
+    return min(score, MAX_SCORE)
+
+
+# ============ SQL ============
+# Лента считает оценку в самом запросе, без цикла по строкам в Python.
+# now — naive UTC, как created_at в БД
+
+def personal_bonus_expr(user):
+    """Бонус за категории и минимальный бюджет пользователя или None"""
+    bonuses = []
+    if user is not None and user.categories:
+        bonuses.append(case((Order.category.in_(user.categories), CATEGORY_BONUS), else_=0))
+    if user is not None and user.min_budget:
+        bonuses.append(case((Order.budget_value >= user.min_budget, MIN_BUDGET_BONUS), else_=0))
+    if not bonuses:
+        return None
+    return sum(bonuses[1:], bonuses[0])
+
+
+def score_expr(now: datetime, user=None):
+    """ai_score: сохранённая база + свежесть + персонализация, не больше MAX_SCORE"""
+    score = func.coalesce(Order.base_score, BASE_SCORE) + case(
+        (Order.created_at >= now - timedelta(seconds=FRESH_SECONDS), FRESH_BONUS),
+        else_=0,
+    )
+    bonus = personal_bonus_expr(user)
+    if bonus is not None:
+        score = score + bonus
+    return case((score > MAX_SCORE, MAX_SCORE), else_=score)
+
+
+def sort_key_expr(user=None):
+    """Ключ сортировки по оценке: rank_key плюс бонус пользователя"""
+    bonus = personal_bonus_expr(user)
+    return Order.rank_key if bonus is None else Order.rank_key + bonus
+
+
+def hot_expr():
+    return func.coalesce(Order.budget_value, 0) >= HOT_BUDGET
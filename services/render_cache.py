@@ -0,0 +1,46 @@
+# services/render_cache.py
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class RenderCache:
+    """Тексты и клавиатуры уведомлений по (order_id, вариант)"""
+
+    def __init__(self, size: int = None):
+        self.size = size or Config.RENDER_CACHE_SIZE
+        self._items: "OrderedDict[Tuple[int, Hashable], Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, order_id: int, variant: Hashable, render: Callable[[], Any]) -> Any:
+        """Возвращает закешированный результат или вызывает render() и запоминает его"""
+        key = (order_id, variant)
+        if key in self._items:
+            self._items.move_to_end(key)
+            self.hits += 1
+            return self._items[key]
+
+        self.misses += 1
+        value = render()
+        self._items[key] = value
+        if len(self._items) > self.size:
+            self._items.popitem(last=False)
+        return value
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._items),
+            "max_size": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+render_cache = RenderCache()
@@ -0,0 +1,95 @@
+# services/routing.py
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from config import Config
+from database.db import Database
+
+logger = logging.getLogger(__name__)
+
+
+class Recipient(NamedTuple):
+    """Получатель уведомлений. Поля названы как у User, чтобы подходить вместо него"""
+    id: int
+    telegram_id: int
+    min_budget: int
+    predator_mode: bool
+    predator_min_budget: int
+    subscription_type: str
+    subscription_end: datetime
+    categories: Tuple[str, ...]
+
+
+class RoutingIndex:
+    """Таблица маршрутизации category -> [Recipient] в памяти"""
+
+    def __init__(self, ttl: int = None):
+        self.ttl = ttl or Config.ROUTING_TTL
+        self._table: Dict[str, List[Recipient]] = {}
+        self._version: Optional[int] = None
+        self._built_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        self._version = None
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._version == Database.users_version
+            and time.monotonic() - self._built_at < self.ttl
+        )
+
+    async def _ensure_fresh(self):
+        if self._is_fresh():
+            return
+        async with self._lock:
+            if self._is_fresh():
+                return
+            version = Database.users_version
+            rows = await Database.get_routing_rows()
+
+            user_categories: Dict[int, List[str]] = {}
+            for category, user_id, *_ in rows:
+                user_categories.setdefault(user_id, []).append(category)
+
+            table: Dict[str, List[Recipient]] = {}
+            for category, user_id, telegram_id, min_budget, predator_mode, \
+                    predator_min_budget, subscription_type, subscription_end in rows:
+                table.setdefault(category, []).append(Recipient(
+                    id=user_id,
+                    telegram_id=telegram_id,
+                    min_budget=min_budget or 0,
+                    predator_mode=bool(predator_mode),
+                    predator_min_budget=predator_min_budget or 50000,
+                    subscription_type=subscription_type or "free",
+                    subscription_end=subscription_end,
+                    categories=tuple(user_categories[user_id]),
+                ))
+
+            self._table = table
+            self._version = version
+            self._built_at = time.monotonic()
+            logger.info(f"Routing index rebuilt: {len(user_categories)} users, {len(table)} categories")
+
+    async def recipients(self, category: str, budget_value: int = None) -> List[Recipient]:
+        """Активные подписчики категории, у которых заказ проходит по минимальному бюджету"""
+        await self._ensure_fresh()
+        now = datetime.utcnow()
+        return [
+            r for r in self._table.get(category, ())
+            if r.subscription_end > now
+            and not (r.min_budget and budget_value and budget_value < r.min_budget)
+        ]
+
+    def stats(self) -> Dict:
+        return {
+            "version": self._version,
+            "age_seconds": int(time.monotonic() - self._built_at) if self._built_at else None,
+            "categories": {category: len(recipients) for category, recipients in self._table.items()},
+        }
+
+
+routing_index = RoutingIndex()
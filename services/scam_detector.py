@@ -1,6 +1,68 @@
 # services/scam_detector.py
 import re
-from typing import Dict, List
+from typing import Dict, FrozenSet, Hashable, Iterable, List, Optional, Set, Tuple
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_constants, sre_parse
+
+
+def _required_literals(items) -> Optional[FrozenSet[str]]:
+    """Подстроки, без которых шаблон не совпадёт, или None"""
+    candidates = []
+    run = []
+    for op, av in items:
+        if op == sre_constants.LITERAL:
+            run.append(chr(av))
+            continue
+        if run:
+            candidates.append(frozenset(["".join(run)]))
+            run = []
+
+        inner = None
+        if op == sre_constants.SUBPATTERN and not av[1] and not av[2]:
+            inner = _required_literals(av[-1])
+        elif op == sre_constants.BRANCH:
+            branches = [_required_literals(branch) for branch in av[1]]
+            if all(branches):
+                inner = frozenset().union(*branches)
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and av[0] >= 1:
+            inner = _required_literals(av[2])
+        if inner:
+            candidates.append(inner)
+    if run:
+        candidates.append(frozenset(["".join(run)]))
+
+    if not candidates:
+        return None
+    return max(candidates, key=lambda literals: min(map(len, literals)))
+
+
+def _fold(text: str) -> str:
+    """Регистронезависимая форма текста для поиска подстрок"""
+    return text.casefold().replace("i\u0307", "i").replace("ı", "i")
+
+
+class RuleEngine:
+    """Набор правил-регулярок, проверяемых разом"""
+
+    def __init__(self, rules: Iterable[Tuple[Hashable, str]]):
+        self._rules = []
+        for rule_id, pattern in rules:
+            literals = _required_literals(sre_parse.parse(pattern, re.IGNORECASE))
+            if literals is not None:
+                literals = frozenset(_fold(literal) for literal in literals)
+            self._rules.append((rule_id, re.compile(pattern, re.IGNORECASE), literals))
+
+    def match(self, text: str) -> Set[Hashable]:
+        """id всех правил, шаблон которых находится в тексте"""
+        folded = _fold(text)
+        return {
+            rule_id
+            for rule_id, regex, literals in self._rules
+            if (literals is None or any(literal in folded for literal in literals)) and regex.search(text)
+        }
 
 
 class ScamDetector:
@@ -43,23 +105,44 @@ class ScamDetector:
         "very_low": (500, 1000, 10, "Низкий бюджет для задачи"),
     }
     
-    async def analyze(self, title: str, description: str, budget: str, budget_value: int) -> Dict:
-        """Полный анализ заказа на мошенничество"""
+    # Типичные фразы давления срочностью
+    URGENCY_PATTERNS = [
+        r'нужно\s*срочно.*сегодня',
+        r'дедлайн\s*через\s*(час|2|3)\s*час',
+        r'прямо\s*сейчас',
+        r'немедленно',
+    ]
+    
+    def __init__(self):
+        self._rules = RuleEngine(self.rule_patterns())
+    
+    @classmethod
+    def rule_patterns(cls) -> List[Tuple[Hashable, str]]:
+        """Все шаблоны с id правила: ("red" | "green" | "urgency", индекс в списке)"""
+        return (
+            [(("red", i), pattern) for i, (pattern, _, _) in enumerate(cls.RED_FLAGS)]
+            + [(("green", i), pattern) for i, (pattern, _, _) in enumerate(cls.GREEN_FLAGS)]
+            + [(("urgency", i), pattern) for i, pattern in enumerate(cls.URGENCY_PATTERNS)]
+        )
+    
+    def analyze(self, title: str, description: str, budget: str, budget_value: int) -> Dict:
+        """Полный анализ заказа на мошенничество (чистая CPU-работа, без await)"""
         text = f"{title} {description}".lower()
         
         risk_score = 0
         warnings = []
         green_signs = []
+        matched = self._rules.match(text)
         
         # Проверяем красные флаги
-        for pattern, score, warning in self.RED_FLAGS:
-            if re.search(pattern, text, re.IGNORECASE):
+        for i, (pattern, score, warning) in enumerate(self.RED_FLAGS):
+            if ("red", i) in matched:
                 risk_score += score
                 warnings.append(warning)
         
         # Проверяем зелёные флаги
-        for pattern, score, sign in self.GREEN_FLAGS:
-            if re.search(pattern, text, re.IGNORECASE):
+        for i, (pattern, score, sign) in enumerate(self.GREEN_FLAGS):
+            if ("green", i) in matched:
                 risk_score += score  # score отрицательный
                 green_signs.append(sign)
         
@@ -80,10 +163,14 @@ class ScamDetector:
             warnings.append("Слишком короткое описание")
         
         # Проверяем на типичные фразы мошенников
-        if self._has_urgency_pressure(text):
+        if self._has_urgency_pressure(matched):
             risk_score += 15
             warnings.append("Давление срочностью")
         
+        return self.build_result(risk_score, warnings, green_signs)
+    
+    def build_result(self, risk_score: int, warnings: List[str], green_signs: List[str]) -> Dict:
+        """Результат анализа по баллу и признакам (и для сохранённого в заказе анализа)"""
         # Нормализуем score (0-100)
         risk_score = max(0, min(100, risk_score))
         
@@ -120,15 +207,9 @@ class ScamDetector:
             "safe_deal_recommended": risk_score >= 35
         }
     
-    def _has_urgency_pressure(self, text: str) -> bool:
-        """Проверка на давление срочностью"""
-        patterns = [
-            r'нужно\s*срочно.*сегодня',
-            r'дедлайн\s*через\s*(час|2|3)\s*час',
-            r'прямо\s*сейчас',
-            r'немедленно',
-        ]
-        return any(re.search(p, text, re.IGNORECASE) for p in patterns)
+    def _has_urgency_pressure(self, matched: Set[Hashable]) -> bool:
+        """Проверка на давление срочностью (по совпавшим правилам)"""
+        return any(("urgency", i) in matched for i in range(len(self.URGENCY_PATTERNS)))
 
 
 scam_detector = ScamDetector()
@@ -1,13 +1,35 @@
 # services/scheduler.py
 import asyncio
+import time
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from database.db import Database
 from config import Config
+from services.parse_engine import parse_engine
+from services.seen_ids import seen_ids
+from services.routing import routing_index
+from services.delivery import delivery_queue, Notification
+from services.ingest import ingest_pipeline
+from services.smart_alerts import smart_alerts
+from services.render_cache import render_cache
+from services.polling import poll_planner
+from services.dedup import dedup_index
+from services.turbo import turbo_refresh
 import logging
 from aiogram import Bot
 
 logger = logging.getLogger(__name__)
 
+SOURCE_EMOJI = {
+    "kwork": "🟢",
+    "fl.ru": "🔵",
+    "habr_freelance": "🟣",
+    "hh": "🔴",
+    "telegram": "📱"
+}
+
+# Для этих типов уведомление собирается SmartAlerts.format_notification
+SMART_NOTIFICATION_TYPES = ("predator", "hot")
+
 
 class OrderScheduler:
     """Планировщик для мониторинга бирж"""
@@ -16,63 +38,128 @@ class OrderScheduler:
         self.bot = bot
         self.scheduler = AsyncIOScheduler()
         self.categories = ["design", "python", "copywriting", "marketing"]
+        self._running = set()
+    
+    async def poll_due(self):
+        """Запускает опрос пар (биржа, категория), которым пора по адаптивному расписанию"""
+        from parsers import ALL_PARSERS
+        
+        jobs = poll_planner.due(parse_engine.jobs(ALL_PARSERS, self.categories))
+        if not jobs:
+            return
+        
+        # Не ждём завершения: медленная биржа не должна задерживать опрос остальных
+        task = asyncio.create_task(self.check_new_orders(jobs))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
     
-    async def check_new_orders(self):
-        """Проверяет новые заказы на всех биржах"""
+    async def check_new_orders(self, jobs=None):
+        """Проверяет новые заказы на биржах (по умолчанию — все биржи и категории)"""
         # Импортируем здесь, чтобы избежать circular import
         from parsers import ALL_PARSERS
-        from bot.keyboards.keyboards import get_order_keyboard
         
-        logger.info("Checking for new orders...")
-        
-        for parser in ALL_PARSERS:
-            for category in self.categories:
-                try:
-                    orders = await parser.parse_orders(category)
-                    
-                    for order_data in orders:
-                        # Сохраняем заказ (если новый)
-                        order = await Database.save_order(order_data)
-                        
-                        if order:  # Новый заказ
-                            # Находим пользователей с этой категорией
-                            users = await Database.get_active_users_for_category(category)
-                            
-                            for user in users:
-                                # Проверяем минимальный бюджет
-                                if user.min_budget and order.budget_value:
-                                    if order.budget_value < user.min_budget:
-                                        continue
-                                
-                                # Отправляем уведомление
-                                await self._send_order_notification(user, order, get_order_keyboard)
-                                
-                except Exception as e:
-                    logger.error(f"Error in scheduler for {parser.SOURCE_NAME}/{category}: {e}")
-        
-        # Закрываем сессии парсеров
-        for parser in ALL_PARSERS:
-            await parser.close()
+        if jobs is None:
+            jobs = parse_engine.jobs(ALL_PARSERS, self.categories)
+        
+        logger.info(f"Checking for new orders: {len(jobs)} queries")
+        started = time.monotonic()
+        
+        # Все запросы идут параллельно, результаты приходят по мере готовности
+        async for parser, category, orders, commits in parse_engine.stream(jobs):
+            await self.process_result(parser, category, orders, time.monotonic(), commits)
+        
+        logger.info(f"Orders check finished in {time.monotonic() - started:.1f}s")
     
-    async def _send_order_notification(self, user, order, get_order_keyboard):
-        """Отправляет уведомление о новом заказе"""
+    async def process_result(self, parser, category: str, orders, parsed_at: float, commits) -> int:
+        """Записывает результат опроса пары и рассылает заказы, возвращает число новых"""
+        from bot.keyboards.keyboards import get_order_keyboard
+        
+        new_orders = []
         try:
-            # Проверяем, не отправляли ли уже
-            if await Database.is_order_sent(user.id, order.id):
-                return
+            # Кросс-посты, скам-анализ и запись одной пачкой, получаем только новые заказы
+            new_orders = await ingest_pipeline.ingest(orders)
             
-            source_emoji = {
-                "kwork": "🟢",
-                "fl.ru": "🔵",
-                "habr_freelance": "🟣",
-                "hh": "🔴",
-                "telegram": "📱"
-            }
+            for order in new_orders:
+                # Подписчики категории с подходящим минимальным бюджетом — из индекса в памяти
+                users = await routing_index.recipients(category, order.budget_value)
+                await self._notify_recipients(order, users, get_order_keyboard, parsed_at)
             
-            emoji = source_emoji.get(order.source, "📋")
-            desc = order.description[:500] if order.description else ""
+            # Запоминаем только после записи в БД, чтобы сбой не потерял заказы
+            seen_ids.add(parser.SOURCE_NAME, [o['external_id'] for o in orders])
+            parse_engine.commit(commits)
             
-            text = f"""
+        except Exception as e:
+            logger.error(f"Error in scheduler for {parser.SOURCE_NAME}/{category}: {e}")
+        finally:
+            # Следующий опрос пары — по тому, сколько новых заказов пришло
+            poll_planner.record(parser.SOURCE_NAME, category, len(new_orders))
+        
+        return len(new_orders)
+    
+    async def rescore_orders(self):
+        """Фоновый пересчёт анализа заказов после изменения правил"""
+        try:
+            await ingest_pipeline.rescore()
+        except Exception as e:
+            logger.error(f"Rescore error: {e}")
+    
+    async def _notify_recipients(self, order, users, get_order_keyboard, parsed_at: float = 0.0):
+        """Ставит заказ в очередь отправки тем, кому его ещё не отправляли"""
+        if not users:
+            return
+        
+        # Проверяем, кому уже отправляли этот заказ или его дубль — один запрос на всех получателей
+        unsent = await Database.get_unsent_user_ids(order.id, [user.id for user in users], order.cluster_id)
+        # Отметки об отправке пишутся с задержкой, поэтому дубли из того же тика отсекаем в памяти
+        unsent = dedup_index.claim_recipients(order.cluster_id, unsent)
+        if not unsent:
+            return
+        
+        # Клавиатура одна на заказ для всех получателей
+        keyboard = render_cache.get(order.id, "keyboard", lambda: get_order_keyboard(order.id, order.url))
+        
+        # Скам-анализ уже сохранён в заказе, приоритет — для каждого получателя (хищник, категория, бюджет)
+        order_data = {
+            'title': order.title,
+            'description': order.description or '',
+            'budget': order.budget or '',
+            'budget_value': order.budget_value or 0,
+            'category': order.category,
+            'source': order.source,
+            'url': order.url,
+        }
+        scam_result = ingest_pipeline.scam_result(order)
+        
+        for user in users:
+            if user.id in unsent:
+                analysis = smart_alerts.analyze_order(order_data, user, scam_result)
+                text = self._render_notification(order, order_data, analysis)
+                # Отправляют воркеры очереди, парсинг их не ждёт
+                delivery_queue.enqueue(Notification(
+                    chat_id=user.telegram_id,
+                    text=text,
+                    reply_markup=keyboard,
+                    user_id=user.id,
+                    order_id=order.id,
+                    lane=analysis['urgency'],
+                    parsed_at=parsed_at,
+                ))
+    
+    def _render_notification(self, order, order_data, analysis) -> str:
+        """Текст уведомления: собирается один раз на заказ и вариант, дальше берётся из кеша"""
+        if analysis['notification_type'] not in SMART_NOTIFICATION_TYPES:
+            return render_cache.get(order.id, "plain", lambda: self._render_plain(order))
+        
+        # Текст SmartAlerts зависит только от типа, эмодзи и причин — у многих получателей они совпадают
+        variant = (analysis['notification_type'], analysis['emoji'], tuple(analysis['reasons']))
+        return render_cache.get(order.id, variant, lambda: smart_alerts.format_notification(order_data, analysis))
+    
+    def _render_plain(self, order) -> str:
+        """Обычное уведомление о новом заказе"""
+        emoji = SOURCE_EMOJI.get(order.source, "📋")
+        desc = order.description[:500] if order.description else ""
+        
+        text = f"""
 {emoji} <b>Новый заказ на {order.source}</b>
 
 📌 <b>{order.title}</b>
@@ -83,31 +170,34 @@ class OrderScheduler:
 
 🔗 <a href="{order.url}">Открыть заказ</a>
 """
-            
-            await self.bot.send_message(
-                user.telegram_id,
-                text,
-                parse_mode="HTML",
-                reply_markup=get_order_keyboard(order.id, order.url),
-                disable_web_page_preview=True
-            )
-            
-            await Database.mark_order_sent(user.id, order.id)
-            
-        except Exception as e:
-            logger.error(f"Error sending notification to {user.telegram_id}: {e}")
+        
+        return text
     
     def start(self):
         """Запускает планировщик"""
+        # Турбо-парсинг обрабатывает результаты так же, как плановый опрос
+        turbo_refresh.attach(self.process_result)
+        
+        # Частая проверка расписания; когда опрашивать каждую пару, решает poll_planner
         self.scheduler.add_job(
-            self.check_new_orders,
+            self.poll_due,
             'interval',
-            seconds=Config.PARSE_INTERVAL,
+            seconds=Config.POLL_TICK,
             id='check_orders',
             max_instances=1
         )
+        self.scheduler.add_job(
+            self.rescore_orders,
+            'interval',
+            seconds=Config.RESCORE_INTERVAL,
+            id='rescore_orders',
+            max_instances=1
+        )
         self.scheduler.start()
-        logger.info(f"Scheduler started with interval {Config.PARSE_INTERVAL}s")
+        logger.info(
+            f"Scheduler started: adaptive polling {Config.POLL_MIN_INTERVAL}-{Config.POLL_MAX_INTERVAL}s, "
+            f"tick {Config.POLL_TICK}s"
+        )
     
     def stop(self):
         """Останавливает планировщик"""
@@ -0,0 +1,101 @@
+# services/seen_ids.py
+import asyncio
+import hashlib
+import logging
+import math
+from typing import Dict, Iterable, List
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Bloom-фильтр фиксированной ёмкости с заданной долей ложных срабатываний"""
+
+    def __init__(self, capacity: int, fp_rate: float):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        # Двойное хеширование: k позиций из одного 128-битного дайджеста
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class SeenIds:
+    """Окно недавно виденных external_id по каждой бирже"""
+
+    def __init__(self, window: int = None, fp_rate: float = None):
+        self.window = window or Config.SEEN_IDS_WINDOW
+        self.fp_rate = fp_rate or Config.SEEN_IDS_FP_RATE
+        self._generations: Dict[str, List[BloomFilter]] = {}
+        self._warmed = set()
+        self._lock = asyncio.Lock()
+        self.dropped = 0
+
+    def _new_filter(self) -> BloomFilter:
+        return BloomFilter(self.window, self.fp_rate)
+
+    def is_seen(self, source: str, external_id: str) -> bool:
+        return any(external_id in f for f in self._generations.get(source, ()))
+
+    def add(self, source: str, external_ids: Iterable[str]):
+        generations = self._generations.setdefault(source, [self._new_filter()])
+        for external_id in external_ids:
+            if not external_id or self.is_seen(source, external_id):
+                continue
+            if generations[0].count >= self.window:
+                generations.insert(0, self._new_filter())
+                del generations[2:]
+            generations[0].add(external_id)
+
+    def filter_new(self, source: str, orders: List[Dict]) -> List[Dict]:
+        """Отбрасывает заказы, которые уже встречались"""
+        new_orders = [o for o in orders if not self.is_seen(source, o.get('external_id'))]
+        self.dropped += len(orders) - len(new_orders)
+        return new_orders
+
+    async def warm_up(self, source: str):
+        """Один раз за процесс подгружает последние id биржи из БД"""
+        if source in self._warmed:
+            return
+        async with self._lock:
+            if source in self._warmed:
+                return
+            from database.db import Database
+            try:
+                external_ids = await Database.get_recent_external_ids(source, self.window)
+            except Exception as e:
+                logger.error(f"Seen ids warm up failed for {source}: {e}")
+                return
+            self.add(source, reversed(external_ids))
+            self._warmed.add(source)
+            logger.info(f"Seen ids for {source}: warmed with {len(external_ids)} ids")
+
+    def stats(self) -> Dict:
+        return {
+            "window": self.window,
+            "fp_rate": self.fp_rate,
+            "dropped": self.dropped,
+            "sources": {
+                source: [f.count for f in generations]
+                for source, generations in self._generations.items()
+            },
+        }
+
+
+seen_ids = SeenIds()
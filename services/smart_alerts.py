@@ -1,17 +1,17 @@
 # services/smart_alerts.py
 from typing import Dict, Tuple
-from services.scam_detector import scam_detector
+from services.ingest import ingest_pipeline
 
 
 class SmartAlerts:
     """Умная система приоритетных уведомлений"""
     
-    async def analyze_order(self, order: Dict, user) -> Dict:
-        """Полный анализ заказа для уведомления"""
+    def analyze_order(self, order: Dict, user, scam_result: Dict = None) -> Dict:
+        """Полный анализ заказа для уведомления (scam_result можно передать готовым)"""
         priority_score = 0
         reasons = []
         
-        budget = order.get('budget_value', 0)
+        budget = order.get('budget_value') or 0
         
         # 1. Высокий бюджет
         if budget >= 100000:
@@ -39,13 +39,9 @@ class SmartAlerts:
             priority_score += 10
             reasons.append(f"✅ Бюджет от {min_budget:,}₽")
         
-        # 4. Проверка на скам
-        scam_result = await scam_detector.analyze(
-            order.get('title', ''),
-            order.get('description', ''),
-            order.get('budget', ''),
-            budget
-        )
+        # 4. Проверка на скам (сохранённая в заказе, один раз на заказ, а не на каждого получателя)
+        if scam_result is None:
+            scam_result = ingest_pipeline.scam_result(order)
         
         if scam_result['risk_level'] == 'safe':
             priority_score += 15
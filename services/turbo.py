@@ -0,0 +1,123 @@
+# services/turbo.py
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from config import Config
+from services.parse_engine import parse_engine
+
+logger = logging.getLogger(__name__)
+
+TURBO_CATEGORIES = ["design", "python", "copywriting", "marketing"]
+
+
+class TurboRun:
+    """Один турбо-обход бирж: прогресс и итог, общие для всех, кто его ждёт"""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.new_orders = 0
+        self.error: Optional[str] = None
+        self.started_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    def _notify(self):
+        # Ждущие держат старое событие, новые изменения ждут на новом
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def snapshot(self) -> Dict:
+        return {
+            "done": self.done,
+            "total": self.total,
+            "new_orders": self.new_orders,
+            "finished": self.finished,
+            "error": self.error,
+        }
+
+    async def progress(self) -> AsyncIterator[Dict]:
+        """Снимок прогресса сейчас и после каждого изменения, последний — с finished"""
+        while True:
+            changed = self._changed
+            yield self.snapshot()
+            if self.finished:
+                return
+            await changed.wait()
+
+    async def wait(self) -> Dict:
+        async for snapshot in self.progress():
+            pass
+        return snapshot
+
+
+class TurboRefresh:
+    """Турбо-парсинг: один обход всех бирж на все нажатия"""
+
+    def __init__(self):
+        self._process: Optional[Callable[..., Awaitable[int]]] = None
+        self._run: Optional[TurboRun] = None
+        self._task: Optional[asyncio.Task] = None
+        self.started = 0
+        self.coalesced = 0
+
+    def attach(self, process: Callable[..., Awaitable[int]]):
+        """process(parser, category, orders, parsed_at, commits) -> число новых заказов"""
+        self._process = process
+
+    def start(self) -> TurboRun:
+        """Текущий или недавний обход, если его нет — запускает новый"""
+        if self._process is None:
+            raise RuntimeError("Turbo refresh needs the scheduler: OrderScheduler.start() attaches it")
+        run = self._run
+        if run is not None and (not run.finished or time.monotonic() - run.finished_at < Config.TURBO_COOLDOWN):
+            self.coalesced += 1
+            return run
+
+        from parsers import ALL_PARSERS
+
+        jobs = parse_engine.jobs(ALL_PARSERS, TURBO_CATEGORIES)
+        run = self._run = TurboRun(len(jobs))
+        self._task = asyncio.create_task(self._refresh(run, jobs))
+        self.started += 1
+        return run
+
+    async def _refresh(self, run: TurboRun, jobs):
+        try:
+            async for parser, category, orders, commits in parse_engine.stream(jobs):
+                run.new_orders += await self._process(parser, category, orders, time.monotonic(), commits)
+                run.done += 1
+                run._notify()
+        except Exception as e:
+            logger.error(f"Turbo parse failed: {e}")
+            run.error = str(e)
+        finally:
+            run.finished_at = time.monotonic()
+            run._notify()
+            logger.info(
+                f"Turbo parse finished in {run.finished_at - run.started_at:.1f}s: "
+                f"{run.new_orders} new orders"
+            )
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def stats(self) -> Dict:
+        run = self._run
+        return {
+            "started": self.started,
+            "coalesced": self.coalesced,
+            "last": run.snapshot() if run else None,
+            "last_duration": round(run.finished_at - run.started_at, 1) if run and run.finished else None,
+        }
+
+
+turbo_refresh = TurboRefresh()